@@ -0,0 +1,79 @@
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from models import DrawPlan, DrawStage, Region
+from planners import apply_dot_budget
+
+
+def atlas_layout(sizes: List[Tuple[int, int]], width: int, height: int) -> list:
+    count = len(sizes)
+    best = None
+    for cols in range(1, count + 1):
+        rows = math.ceil(count / cols)
+        cell_w, cell_h = width // cols, height // rows
+        if cell_w < 1 or cell_h < 1:
+            continue
+        covered = sum(
+            min(cell_w / max(w, 1), cell_h / max(h, 1)) ** 2 * w * h for w, h in sizes
+        )
+        if best is None or covered > best[0]:
+            best = (covered, cols, cell_w, cell_h)
+    if best is None:
+        return []
+
+    _, cols, cell_w, cell_h = best
+    return [
+        Region((index % cols) * cell_w, (index // cols) * cell_h, cell_w, cell_h)
+        for index in range(count)
+    ]
+
+
+def merge_plans(
+    plans: list, offsets: list, width: int, height: int, dot_budget: int = 0
+) -> DrawPlan:
+    palette = {}
+    areas = {}
+    groups = {}
+    for plan, (dx, dy) in zip(plans, offsets):
+        palette.update(plan.palette)
+        shift = np.array([dx, dy], dtype=np.int32)
+        for stage in plan.stages:
+            areas[stage.color] = areas.get(stage.color, 0) + stage.event_count
+            group = groups.setdefault(
+                (stage.color, stage.brush_px, stage.pass_index), ([], [])
+            )
+            if len(stage.dots):
+                group[0].append(np.asarray(stage.dots, dtype=np.int32) + shift)
+            group[1].extend(
+                np.asarray(stroke, dtype=np.int32) + shift for stroke in stage.strokes
+            )
+
+    background = None
+    if plans and all(plan.background is not None for plan in plans):
+        background = max(areas, key=areas.get)
+
+    stages = [
+        DrawStage(
+            color,
+            brush_px,
+            np.concatenate(dots) if dots else np.empty((0, 2), dtype=np.int32),
+            strokes,
+            pass_index,
+        )
+        for (color, brush_px, pass_index), (dots, strokes) in groups.items()
+    ]
+    merged = DrawPlan(width, height, stages, palette, background)
+    planned_events = merged.event_count
+    if dot_budget > 0 and planned_events > dot_budget:
+        merged.stages = apply_dot_budget(merged.stages, dot_budget, background)
+    merged.stats = {
+        "planner": "atlas",
+        "events": merged.event_count,
+        "grid_events": sum(plan.stats.get("grid_events", 0) for plan in plans),
+        "images": len(plans),
+    }
+    if planned_events > merged.event_count:
+        merged.stats["budget_dropped"] = planned_events - merged.event_count
+    return merged
@@ -0,0 +1,64 @@
+import numpy as np
+from scipy import ndimage
+
+from models import CleanupSettings
+from utils import NO_COLOR
+
+
+def _open_masks(labels, colors: list, fill: int, radius: int):
+    structure = np.ones((2 * radius + 1, 2 * radius + 1), dtype=bool)
+    for index in colors:
+        mask = labels == index
+        kept = ndimage.binary_opening(mask, structure=structure)
+        labels[mask & ~kept] = fill
+
+
+def _drop_specks(labels, colors: list, fill: int, min_size: int):
+    for index in colors:
+        components, count = ndimage.label(labels == index)
+        if not count:
+            continue
+        sizes = np.bincount(components.ravel())
+        small = sizes < min_size
+        small[0] = False
+        labels[small[components]] = fill
+
+
+def _fill_holes(labels, colors: list, fill: int, max_size: int, columns: int):
+    holes, count = ndimage.label(labels == fill)
+    if not count:
+        return
+    sizes = np.bincount(holes.ravel())
+    border = np.unique(np.concatenate([holes[0], holes[-1], holes[:, 0], holes[:, -1]]))
+    fillable = sizes <= max_size
+    fillable[0] = False
+    fillable[border] = False
+    if not fillable.any():
+        return
+
+    compact = (np.cumsum(fillable) * fillable).astype(np.int32)
+    holes = compact[holes]
+    count = int(compact.max())
+    neighbours = ndimage.maximum_filter(holes, size=3, mode="constant")
+    ring = (neighbours > 0) & (holes == 0) & np.isin(labels, colors)
+    votes = np.bincount(
+        neighbours[ring].astype(np.int64) * columns + labels[ring],
+        minlength=(count + 1) * columns,
+    ).reshape(count + 1, columns)
+    surround = np.where(votes.any(axis=1), votes.argmax(axis=1), fill)
+    target = holes > 0
+    labels[target] = surround[holes[target]]
+
+
+def clean_labels(labels, names: list, background, cleanup: CleanupSettings):
+    fill = names.index(background) if background in names else NO_COLOR
+    colors = [index for index in range(len(names)) if index != fill]
+    labels = labels.copy()
+
+    if cleanup.open_px > 0:
+        _open_masks(labels, colors, fill, cleanup.open_px)
+    if cleanup.min_component_px > 1:
+        _drop_specks(labels, colors, fill, cleanup.min_component_px)
+    if cleanup.fill_holes_px > 0:
+        _fill_holes(labels, colors, fill, cleanup.fill_holes_px, len(names))
+    return labels
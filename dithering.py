@@ -0,0 +1,96 @@
+from bisect import bisect_right
+
+import numpy as np
+from scipy.ndimage import uniform_filter
+
+from utils import NO_COLOR, palette_names
+
+BAYER_8 = (
+    np.array(
+        [
+            [0, 32, 8, 40, 2, 34, 10, 42],
+            [48, 16, 56, 24, 50, 18, 58, 26],
+            [12, 44, 4, 36, 14, 46, 6, 38],
+            [60, 28, 52, 20, 62, 30, 54, 22],
+            [3, 35, 11, 43, 1, 33, 9, 41],
+            [51, 19, 59, 27, 49, 17, 57, 25],
+            [15, 47, 7, 39, 13, 45, 5, 37],
+            [63, 31, 55, 23, 61, 29, 53, 21],
+        ],
+        dtype=np.float32,
+    )
+    + 0.5
+) / 64
+
+
+def grid_tones(img_array, threshold: int, spacing: int) -> np.ndarray:
+    means = uniform_filter(img_array.astype(np.float32), size=spacing)
+    return np.clip(means[::spacing, ::spacing] + (128 - threshold), 0, 255)
+
+
+def tone_levels(names: list, active_colors: dict) -> tuple:
+    levels = [float(active_colors[name]["luminance"]) for name in names]
+    indices = list(range(len(names)))
+    if len(names) == 1:
+        levels.append(255.0)
+        indices.append(NO_COLOR)
+    return levels, indices
+
+
+def ordered_dither(tones: np.ndarray, levels: list) -> np.ndarray:
+    levels = np.asarray(levels, dtype=np.float32)
+    if len(levels) == 1:
+        return np.zeros(tones.shape, dtype=np.int64)
+    low = np.clip(np.searchsorted(levels, tones, side="right") - 1, 0, len(levels) - 2)
+    span = np.maximum(levels[low + 1] - levels[low], 1e-6)
+    fraction = (tones - levels[low]) / span
+    h, w = tones.shape
+    bayer = np.tile(BAYER_8, (-(-h // 8), -(-w // 8)))[:h, :w]
+    return low + (fraction > bayer)
+
+
+def diffusion_dither(tones: np.ndarray, levels: list) -> np.ndarray:
+    h, w = tones.shape
+    chosen = np.zeros((h, w), dtype=np.int64)
+    midpoints = [(a + b) / 2 for a, b in zip(levels[:-1], levels[1:])]
+    current = tones[0].tolist()
+    for y in range(h):
+        below = tones[y + 1].tolist() if y + 1 < h else [0.0] * w
+        row = [0] * w
+        forward = y % 2 == 0
+        step = 1 if forward else -1
+        for x in range(0, w) if forward else range(w - 1, -1, -1):
+            value = current[x]
+            index = bisect_right(midpoints, value)
+            row[x] = index
+            error = value - levels[index]
+            ahead = x + step
+            if 0 <= ahead < w:
+                current[ahead] += error * 0.4375
+                below[ahead] += error * 0.0625
+            below[x] += error * 0.3125
+            if 0 <= x - step < w:
+                below[x - step] += error * 0.1875
+        chosen[y] = row
+        current = below
+    return chosen
+
+
+def dither_palette_labels(
+    img_array, color_sources, threshold: int, spacing: int, method: str
+):
+    names, active_colors = palette_names(color_sources)
+    levels, indices = tone_levels(names, active_colors)
+    unique = sorted(set(levels))
+    level_index = [indices[levels.index(level)] for level in unique]
+
+    tones = grid_tones(img_array, threshold, spacing)
+    if method == "diffusion":
+        chosen = diffusion_dither(tones, unique)
+    else:
+        chosen = ordered_dither(tones, unique)
+    grid = np.asarray(level_index, dtype=np.uint8)[chosen]
+
+    h, w = img_array.shape
+    labels = np.repeat(np.repeat(grid, spacing, axis=0), spacing, axis=1)[:h, :w]
+    return np.ascontiguousarray(labels), names, active_colors
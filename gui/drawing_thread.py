@@ -1,13 +1,33 @@
 import threading
 import time
-import pyautogui
-from PyQt5.QtWidgets import QApplication
+from typing import Optional
+from PyQt5.QtCore import QThread, pyqtSignal
 from PIL import Image
-from models import Region, ColorLocation
+from models import Region, ColorLocation, DrawPlan, PaletteState, PlanSettings
 from utils import process_image_for_multicolor_drawing
+from gui.stop_hotkey import StopHotkey
 
+PROGRESS_INTERVAL = 0.1
+EVENT_CHUNK = 4096
+DRAG_SECONDS_PER_PX = 0.002
+STEP_SECONDS = 0.01
+EVENT_PAUSE = 0.01
+
+
+def estimate_draw_seconds(events: int, stages: int, rate: float = 0.0) -> float:
+    if rate > 0:
+        return 3.25 + events / rate
+    per_event = 2 * EVENT_PAUSE + 0.05 / 50
+    per_stage = 0.15 + 0.1 + 0.15 + 0.3 + 0.5
+    return 3.25 + events * per_event + stages * per_stage
+
+
+class DrawingThread(QThread):
+    progress_changed = pyqtSignal(int, int, float)
+    state_changed = pyqtSignal(str)
+    beep_requested = pyqtSignal()
+    drawing_finished = pyqtSignal(dict)
 
-class DrawingThread(threading.Thread):
     def __init__(
         self,
         img: Image.Image,
@@ -15,129 +35,294 @@ class DrawingThread(threading.Thread):
         brush_px: int,
         threshold: int,
         stop_flag: threading.Event,
-        parent_widget,
+        parent_widget=None,
         color_locations: dict = None,
         brightness_offset: int = 0,
+        palette_state: PaletteState = None,
+        brush_locations: list = None,
+        settings: PlanSettings = None,
+        plan: DrawPlan = None,
+        offset: tuple = (0, 0),
+        scale: float = 1.0,
     ):
-        super().__init__()
-        self.img = img.copy()
+        super().__init__(parent_widget)
+        self.img = img.copy() if img is not None else None
         self.region = region
         self.brush_px = brush_px
         self.threshold = threshold
         self.stop_flag = stop_flag
-        self.parent_widget = parent_widget
         self.color_locations = color_locations or {}
         self.brightness_offset = brightness_offset
+        self.palette_state = palette_state or PaletteState()
+        self.brush_locations = brush_locations or []
+        self.settings = settings or PlanSettings()
+        self.plan = plan
+        self.offset = offset
+        self.scale = scale
+
+        self._dots_drawn = 0
+        self._total_dots = 0
+        self._started_at = 0.0
+        self._last_progress = 0.0
+        self._stop_requested_at: Optional[float] = None
+
+    def request_stop(self):
+        if self._stop_requested_at is None:
+            self._stop_requested_at = time.monotonic()
+        self.stop_flag.set()
+
+    def _wait(self, seconds: float) -> bool:
+        return self.stop_flag.wait(seconds)
+
+    def _glide(self, x: int, y: int, duration: float) -> bool:
+        import pyautogui
+
+        x0, y0 = pyautogui.position()
+        steps = max(1, round(duration / STEP_SECONDS))
+        for step in range(1, steps + 1):
+            t = step / steps
+            pyautogui.moveTo(round(x0 + (x - x0) * t), round(y0 + (y - y0) * t))
+            if self._wait(STEP_SECONDS):
+                return False
+        return True
+
+    def _report_progress(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+
+        eta = -1.0
+        elapsed = now - self._started_at
+        if self._dots_drawn > 0 and elapsed > 0:
+            rate = self._dots_drawn / elapsed
+            eta = (self._total_dots - self._dots_drawn) / rate
+        self.progress_changed.emit(self._dots_drawn, self._total_dots, eta)
+
+    def _click_location(self, location, description: str) -> bool:
+        import pyautogui
+
+        try:
+            print(f"Switching to {description} at ({location.x}, {location.y})")
+            if not self._glide(location.x, location.y, 0.15) or self._wait(0.1):
+                return False
+            pyautogui.click()
+            self._wait(0.15)
+            print(f"Successfully switched to {description}")
+            return True
+        except Exception as e:
+            print(f"Error clicking {description} location: {e}")
+            return False
 
-    def _click_color_location(self, color_type: str):
+    def _click_color_location(self, color_type: str) -> bool:
         location = self.color_locations.get(color_type)
 
         if location:
-            try:
-                print(
-                    f"Switching to {color_type} color at ({location.x}, {location.y})"
-                )
-                pyautogui.moveTo(location.x, location.y, duration=0.15)
-                time.sleep(0.1)
-                pyautogui.click()
-                time.sleep(0.15)
-                print(f"Successfully switched to {color_type} color")
-            except Exception as e:
-                print(f"Error clicking {color_type} color location: {e}")
+            if self.palette_state.active_color == location:
+                print(f"{color_type} color already active, skipping switch")
+                return False
+            if self._click_location(location, f"{color_type} color"):
+                self.palette_state.active_color = location
+                return True
+            self.palette_state.active_color = None
         else:
             print(f"No {color_type} color location set")
+        return False
 
-    def run(self):
-        try:
-            result = process_image_for_multicolor_drawing(
-                self.img,
-                self.region.w,
-                self.region.h,
-                self.threshold,
-                self.brush_px,
-                self.color_locations,
-                None,
-                self.brightness_offset,
+    def _brush_location(self, brush_px: int):
+        return next((loc for loc in self.brush_locations if loc.size == brush_px), None)
+
+    def _select_brush(self, brush_px: int) -> bool:
+        location = self._brush_location(brush_px)
+
+        if location:
+            if self.palette_state.active_brush == location:
+                return False
+            if self._click_location(location, f"{brush_px}px brush"):
+                self.palette_state.active_brush = location
+                return True
+            self.palette_state.active_brush = None
+        return False
+
+    def _order_pass(self, stages: list, active, brush) -> list:
+        groups = {}
+        for stage in stages:
+            groups.setdefault(stage.color, []).append(stage)
+
+        colors = sorted(groups, key=lambda c: sum(s.event_count for s in groups[c]))
+        first = [
+            color
+            for color in colors
+            if active is not None and self.color_locations.get(color) == active
+        ][:1]
+        colors = first + [color for color in colors if color not in first]
+
+        ordered = []
+        for color in colors:
+            group = sorted(
+                groups[color],
+                key=lambda s: brush is None
+                or self._brush_location(s.brush_px) != brush,
             )
+            ordered.extend(group)
+            brush = self._brush_location(group[-1].brush_px)
+        return ordered
 
-            if result is None:
-                QApplication.beep()
-                return
+    def _order_stages(self, stages: list) -> list:
+        passes = {}
+        for stage in stages:
+            passes.setdefault(stage.pass_index, []).append(stage)
 
-            img_resized, color_dots, active_colors = result
+        ordered = []
+        active = self.palette_state.active_color
+        brush = self.palette_state.active_brush
+        for index in sorted(passes):
+            group = self._order_pass(passes[index], active, brush)
+            ordered.extend(group)
+            active = self.color_locations.get(group[-1].color)
+            brush = self._brush_location(group[-1].brush_px)
+        return ordered
 
-            positions_dict = color_dots
+    def _to_screen(self, x, y):
+        return (
+            int(self.region.x + self.offset[0] + x * self.scale),
+            int(self.region.y + self.offset[1] + y * self.scale),
+        )
 
-            if not any(positions_dict.values()):
-                QApplication.beep()
+    def _drag(self, stroke):
+        import pyautogui
+
+        points = [self._to_screen(x, y) for x, y in stroke.tolist()]
+        x0, y0 = points[0]
+        pyautogui.moveTo(x0, y0)
+        if self._wait(EVENT_PAUSE):
+            return
+        pyautogui.mouseDown()
+        try:
+            for x, y in points[1:]:
+                distance = abs(x - x0) + abs(y - y0)
+                if not self._glide(x, y, max(0.02, distance * DRAG_SECONDS_PER_PX)):
+                    break
+                x0, y0 = x, y
+        finally:
+            pyautogui.mouseUp()
+
+    def _iter_dots(self, dots):
+        for start in range(0, len(dots), EVENT_CHUNK):
+            yield from dots[start : start + EVENT_CHUNK].tolist()
+
+    def run(self):
+        import pyautogui
+
+        telemetry = {"dots_drawn": 0, "total_dots": 0, "elapsed": 0.0}
+        hotkey = StopHotkey(self.request_stop)
+        self.state_changed.emit("Planning…")
+        try:
+            plan = self.plan
+            if plan is None:
+                plan = process_image_for_multicolor_drawing(
+                    self.img,
+                    self.region.w,
+                    self.region.h,
+                    self.threshold,
+                    self.brush_px,
+                    self.color_locations,
+                    None,
+                    self.brightness_offset,
+                    self.settings,
+                )
+
+            if plan is None or not plan.event_count:
+                self.beep_requested.emit()
+                self.state_changed.emit("Nothing to draw")
                 return
 
+            hint = " (Esc to stop)" if hotkey.start() else ""
             for i in range(3, 0, -1):
-                if self.stop_flag.is_set():
+                self.state_changed.emit(f"Starting in {i}…{hint}")
+                self.beep_requested.emit()
+                if self._wait(1):
+                    self.state_changed.emit("Cancelled")
                     return
-                QApplication.beep()
-                time.sleep(1)
 
-            time.sleep(0.25)
+            if self._wait(0.25):
+                self.state_changed.emit("Cancelled")
+                return
 
-            pyautogui.PAUSE = 0.01
+            pyautogui.PAUSE = 0
             pyautogui.FAILSAFE = True
 
-            drawing_stages = [
-                (color_name, positions)
-                for color_name, positions in positions_dict.items()
-                if positions
-            ]
-
-            bg_color = None
-            bg_positions = []
-            if drawing_stages:
-                most_common_stage = max(drawing_stages, key=lambda s: len(s[1]))
-                bg_color, bg_positions = most_common_stage
-                print(
-                    f"Setting background color to '{bg_color}' ({len(bg_positions)} dots) and skipping that stage"
-                )
-                self._click_color_location(bg_color)
-                drawing_stages = [
-                    (c, pos) for (c, pos) in drawing_stages if c != bg_color
-                ]
-            total_dots = sum(len(positions) for _, positions in drawing_stages)
-            dots_drawn = 0
-
-            for stage_idx, (color_type, positions) in enumerate(drawing_stages):
+            drawing_stages = self._order_stages(plan.drawn_stages())
+            if plan.background is not None:
+                first = self.color_locations.get(drawing_stages[0].color)
+                if first is not None and first == self.palette_state.active_color:
+                    print(
+                        f"Skipping background '{plan.background}': "
+                        f"{drawing_stages[0].color} is already active"
+                    )
+                else:
+                    print(
+                        f"Setting background color to '{plan.background}' and skipping that stage"
+                    )
+                    self._click_color_location(plan.background)
+            self._total_dots = sum(stage.event_count for stage in drawing_stages)
+            self._dots_drawn = 0
+            self._started_at = time.monotonic()
+            self._report_progress(force=True)
+
+            for stage_idx, stage in enumerate(drawing_stages):
                 if self.stop_flag.is_set():
                     break
 
-                print(f"Starting {color_type} stage with {len(positions)} positions")
-
-                self._click_color_location(color_type)
+                color_type = stage.color
+                print(
+                    f"Starting {color_type} stage ({stage.brush_px}px) with "
+                    f"{len(stage.dots)} dots and {len(stage.strokes)} strokes"
+                )
+                self.state_changed.emit(
+                    f"Drawing {color_type} ({stage_idx + 1}/{len(drawing_stages)})"
+                )
 
-                time.sleep(0.3)
+                switched = self._click_color_location(color_type)
+                switched = self._select_brush(stage.brush_px) or switched
+                if switched:
+                    self._wait(0.3)
 
                 if self.stop_flag.is_set():
                     break
 
-                for idx, (sx, sy) in enumerate(positions):
+                for stroke in stage.strokes:
                     if self.stop_flag.is_set():
                         break
 
                     try:
-                        pyautogui.moveTo(
-                            self.region.x + sx, self.region.y + sy, duration=0.02
-                        )
-                        pyautogui.click()
-                        dots_drawn += 1
+                        self._drag(stroke)
+                        self._dots_drawn += 1
+                        self._report_progress()
+                    except pyautogui.FailSafeException:
+                        self.request_stop()
+                        break
+                    except Exception as e:
+                        print(f"Error during stroke: {e}")
+                        continue
 
-                        if idx % 50 == 0:
-                            time.sleep(0.05)
+                for idx, (sx, sy) in enumerate(self._iter_dots(stage.dots)):
+                    if self.stop_flag.is_set():
+                        break
 
-                        if dots_drawn % 100 == 0:
-                            print(
-                                f"Progress: {dots_drawn}/{total_dots} dots ({color_type} stage)"
-                            )
+                    try:
+                        pyautogui.moveTo(*self._to_screen(sx, sy))
+                        if self._wait(EVENT_PAUSE):
+                            break
+                        pyautogui.click()
+                        self._dots_drawn += 1
+                        self._report_progress()
+
+                        if self._wait(0.05 if idx % 50 == 0 else EVENT_PAUSE):
+                            break
 
                     except pyautogui.FailSafeException:
-                        self.stop_flag.set()
+                        self.request_stop()
                         break
                     except Exception as e:
                         print(f"Error during click at {sx}, {sy}: {e}")
@@ -146,12 +331,24 @@ class DrawingThread(threading.Thread):
                 print(f"Completed {color_type} stage")
 
                 if stage_idx < len(drawing_stages) - 1:
-                    time.sleep(0.5)
+                    self._wait(0.5)
 
-            print(f"Drawing complete. Drew {dots_drawn} dots total.")
+            self._report_progress(force=True)
+            print(f"Drawing complete. Drew {self._dots_drawn} dots total.")
+            self.state_changed.emit(
+                "Cancelled" if self.stop_flag.is_set() else "Drawing complete"
+            )
 
         except Exception as e:
             print(f"Error while drawing: {e}")
+            self.state_changed.emit(f"Error: {e}")
         finally:
-            if hasattr(self.parent_widget, "cancel_draw_btn"):
-                self.parent_widget.cancel_draw_btn.setEnabled(False)
+            hotkey.stop()
+            if self._stop_requested_at is not None:
+                telemetry["stop_latency"] = time.monotonic() - self._stop_requested_at
+            telemetry["dots_drawn"] = self._dots_drawn
+            telemetry["total_dots"] = self._total_dots
+            if self._started_at:
+                telemetry["elapsed"] = time.monotonic() - self._started_at
+            telemetry["cancelled"] = self.stop_flag.is_set()
+            self.drawing_finished.emit(telemetry)
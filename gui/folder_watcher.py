@@ -0,0 +1,97 @@
+import os
+from typing import Optional
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+DEBOUNCE_MS = 500
+
+
+class FolderWatcher(QObject):
+    image_ready = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.directory: Optional[str] = None
+        self._seen = set()
+        self._pending = {}
+        self._failed = {}
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._schedule_scan)
+        self._watcher.fileChanged.connect(self._schedule_scan)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(DEBOUNCE_MS)
+        self._timer.timeout.connect(self._scan)
+
+    def watch(self, directory: str):
+        self.stop()
+        self.directory = directory
+        self._watcher.addPath(directory)
+        self._schedule_scan()
+
+    def stop(self):
+        watched = self._watcher.directories() + self._watcher.files()
+        if watched:
+            self._watcher.removePaths(watched)
+        self._timer.stop()
+        self._seen.clear()
+        self._pending.clear()
+        self._failed.clear()
+        self.directory = None
+
+    def retry(self, path: str):
+        self._seen.discard(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        self._failed[path] = (stat.st_size, stat.st_mtime_ns)
+        self._watcher.addPath(path)
+        self._timer.start()
+
+    def _schedule_scan(self, *_):
+        self._timer.start()
+
+    def _candidates(self) -> list:
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError as e:
+            print(f"Could not scan watched folder {self.directory}: {e}")
+            return []
+        return sorted(
+            entry.path
+            for entry in entries
+            if not entry.name.startswith(".")
+            and entry.name.lower().endswith(IMAGE_SUFFIXES)
+            and entry.is_file()
+        )
+
+    def _scan(self):
+        if self.directory is None:
+            return
+
+        waiting = False
+        for path in self._candidates():
+            if path in self._seen:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if path in self._failed:
+                if self._failed[path] == signature:
+                    continue
+                del self._failed[path]
+                self._watcher.removePath(path)
+            if stat.st_size > 0 and self._pending.get(path) == signature:
+                del self._pending[path]
+                self._seen.add(path)
+                self.image_ready.emit(path)
+            else:
+                self._pending[path] = signature
+                waiting = True
+
+        if waiting:
+            self._timer.start()
@@ -6,6 +6,7 @@ from PyQt5.QtGui import QPixmap, QPainter
 class ImageListWidget(QWidget):
     draw_requested = pyqtSignal(str)
     remove_requested = pyqtSignal(str)
+    save_plan_requested = pyqtSignal(str)
 
     def __init__(self, image_path, image, parent=None):
         super().__init__(parent)
@@ -24,11 +25,20 @@ class ImageListWidget(QWidget):
         self.path_label.setStyleSheet("font-weight: bold;")
         info_layout.addWidget(self.path_label)
 
+        self.stats_label = QLabel()
+        self.stats_label.setStyleSheet("color: #616161; font-size: 11px;")
+        self.stats_label.hide()
+        info_layout.addWidget(self.stats_label)
+
         btn_layout = QHBoxLayout()
         self.draw_btn = QPushButton("Draw")
         self.draw_btn.clicked.connect(self._on_draw_clicked)
         btn_layout.addWidget(self.draw_btn)
 
+        self.save_plan_btn = QPushButton("Save Plan")
+        self.save_plan_btn.clicked.connect(self._on_save_plan_clicked)
+        btn_layout.addWidget(self.save_plan_btn)
+
         self.remove_btn = QPushButton("Remove")
         self.remove_btn.clicked.connect(self._on_remove_clicked)
         btn_layout.addWidget(self.remove_btn)
@@ -36,6 +46,10 @@ class ImageListWidget(QWidget):
         info_layout.addLayout(btn_layout)
         layout.addLayout(info_layout)
 
+    def set_stats(self, text: str):
+        self.stats_label.setText(text)
+        self.stats_label.setVisible(bool(text))
+
     def update_preview(self, pixmap: QPixmap):
         if pixmap is not None:
             preview_size = self.preview.size()
@@ -53,5 +67,8 @@ class ImageListWidget(QWidget):
     def _on_draw_clicked(self):
         self.draw_requested.emit(self.image_path)
 
+    def _on_save_plan_clicked(self):
+        self.save_plan_requested.emit(self.image_path)
+
     def _on_remove_clicked(self):
         self.remove_requested.emit(self.image_path)
@@ -0,0 +1,68 @@
+import queue
+from PyQt5.QtCore import QThread, pyqtSignal
+from PIL import Image
+from plan_cache import PlanCache, image_digest
+from utils import process_image_for_multicolor_drawing
+
+
+class IngestThread(QThread):
+    image_planned = pyqtSignal(str, object, object, str)
+    ingest_failed = pyqtSignal(str)
+
+    def __init__(self, plan_cache: PlanCache, parent=None):
+        super().__init__(parent)
+        self.plan_cache = plan_cache
+        self._queue = queue.Queue()
+
+    def submit(self, path: str, job: dict):
+        self._queue.put((path, job))
+        if not self.isRunning():
+            self.start()
+
+    def stop(self):
+        if self.isRunning():
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put(None)
+            self.wait()
+
+    def _ingest(self, path: str, job: dict):
+        img = Image.open(path)
+        img.load()
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+
+        digest = image_digest(img, path)
+        key = self.plan_cache.key_for(digest, **job["key"])
+        plan = self.plan_cache.load(key)
+        if plan is None:
+            plan = process_image_for_multicolor_drawing(
+                img,
+                job["width"],
+                job["height"],
+                job["threshold"],
+                job["brush_px"],
+                job["color_locations"],
+                job["sampled_colors"],
+                job["brightness_offset"],
+                job["settings"],
+            )
+            if plan is not None:
+                self.plan_cache.store(
+                    key, plan, brush_px=job["brush_px"], settings=job["settings"]
+                )
+        return img, plan, digest
+
+    def run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, job = item
+            try:
+                img, plan, digest = self._ingest(path, job)
+            except Exception as e:
+                print(f"Could not ingest {path}: {e}")
+                self.ingest_failed.emit(path)
+                continue
+            self.image_planned.emit(path, img, plan, digest)
@@ -1,53 +1,50 @@
-import time
 from typing import Optional
-from PyQt5.QtCore import Qt, QPoint
+from PyQt5.QtCore import Qt, QRect
 from PyQt5.QtGui import QPainter, QColor, QFont
-from PyQt5.QtWidgets import QWidget, QApplication
+from gui.screen_overlay import ScreenOverlay
 from models import ColorLocation
 
 
-class LocationPicker(QWidget):
+class LocationPicker(ScreenOverlay):
     def __init__(self, parent=None, instruction_text="Click to set location"):
-        super().__init__(parent)
+        super().__init__(parent, shade=100)
         self.instruction_text = instruction_text
-        self.setWindowFlags(
-            Qt.WindowType(
-                Qt.WindowType.WindowStaysOnTopHint
-                | Qt.WindowType.FramelessWindowHint
-                | Qt.WindowType.Dialog
-            )
-        )
-        self.setWindowState(
-            self.windowState() | Qt.WindowState(Qt.WindowState.WindowFullScreen)
-        )
-        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.setCursor(Qt.CursorShape.CrossCursor)
         self.selected_location: Optional[ColorLocation] = None
 
     def paintEvent(self, a0):
         painter = QPainter(self)
+        area = a0.rect()
+
+        self.paint_shade(painter, area)
+
+        text_area = QRect(0, 0, self.width(), 170)
+        if text_area.intersects(area):
+            painter.setPen(QColor(255, 255, 255))
+            font = QFont()
+            font.setPointSize(16)
+            font.setBold(True)
+            painter.setFont(font)
 
-        painter.fillRect(self.rect(), QColor(0, 0, 0, 100))
+            text_rect = self.rect()
+            text_rect.setHeight(100)
+            painter.drawText(
+                text_rect, Qt.AlignmentFlag.AlignCenter, self.instruction_text
+            )
 
-        painter.setPen(QColor(255, 255, 255))
-        font = QFont()
-        font.setPointSize(16)
-        font.setBold(True)
-        painter.setFont(font)
+            painter.setPen(QColor(255, 255, 0))
+            font.setPointSize(12)
+            painter.setFont(font)
 
-        text_rect = self.rect()
-        text_rect.setHeight(100)
-        painter.drawText(text_rect, Qt.AlignmentFlag.AlignCenter, self.instruction_text)
+            help_text = "Click anywhere to set the color location. Press ESC to cancel."
+            help_rect = self.rect()
+            help_rect.setTop(120)
+            help_rect.setHeight(50)
+            painter.drawText(help_rect, Qt.AlignmentFlag.AlignCenter, help_text)
 
-        painter.setPen(QColor(255, 255, 0))
-        font.setPointSize(12)
-        painter.setFont(font)
+        self.paint_loupe(painter)
 
-        help_text = "Click anywhere to set the color location. Press ESC to cancel."
-        help_rect = self.rect()
-        help_rect.setTop(120)
-        help_rect.setHeight(50)
-        painter.drawText(help_rect, Qt.AlignmentFlag.AlignCenter, help_text)
+    def mouseMoveEvent(self, a0):
+        self.track_cursor(a0.pos())
 
     def mousePressEvent(self, a0):
         pos = a0.globalPos()
@@ -65,15 +62,5 @@ class LocationPicker(QWidget):
         parent=None, instruction_text="Click to set location"
     ) -> Optional[ColorLocation]:
         picker = LocationPicker(parent, instruction_text)
-        picker.show()
         picker.exec_()
         return picker.selected_location
-
-    def exec_(self):
-        self.show()
-        self.activateWindow()
-        self.raise_()
-
-        while self.isVisible():
-            QApplication.processEvents()
-            time.sleep(0.01)
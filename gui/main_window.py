@@ -1,8 +1,8 @@
 import threading
-import numpy as np
 
-from typing import Optional, List, Tuple
-from PyQt5.QtCore import Qt, QPoint
+from dataclasses import astuple, replace
+from typing import Optional, Dict, List, Tuple
+from PyQt5.QtCore import Qt, QPoint, QTimer
 from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -18,21 +18,42 @@ from PyQt5.QtWidgets import (
     QApplication,
     QShortcut,
     QGroupBox,
+    QProgressBar,
+    QComboBox,
+    QDoubleSpinBox,
+    QCheckBox,
 )
 from PyQt5.QtGui import QPainter, QColor, QPixmap, QKeySequence
 from PIL import Image
 
-from models import Region, ColorLocation
+from models import (
+    Region,
+    ColorLocation,
+    BrushLocation,
+    PaletteState,
+    PlanSettings,
+    CleanupSettings,
+)
 from utils import (
-    pil_to_qpixmap,
+    array_to_qimage,
+    qimage_to_pil,
     process_image_for_multicolor_drawing,
+    measure_plan_accuracy,
     sample_color_at_location,
     rgb_to_luminance,
+    warm_up_imports,
+    DITHER_PLANNERS,
+    MAX_PALETTE_COLORS,
 )
 from gui.region_selector import RegionSelector
 from gui.location_picker import LocationPicker
 from gui.drawing_thread import DrawingThread
 from gui.image_list_widget import ImageListWidget
+from gui.preview_cache import PreviewCache
+from gui.folder_watcher import FolderWatcher
+from gui.ingest_thread import IngestThread
+from plan_cache import PlanCache, image_digest
+from profiling import interaction, stage
 
 
 class DotDrawerApp(QWidget):
@@ -45,11 +66,27 @@ class DotDrawerApp(QWidget):
         self.selected_region: Optional[Region] = None
         self.uploaded_images: List[Tuple[str, Image.Image]] = []
 
-        self.color_locations = {"dark": None, "medium": None, "light": None}
-        self.sampled_colors = {"dark": None, "medium": None, "light": None}
-
+        self.color_locations: Dict[str, ColorLocation] = {}
+        self.sampled_colors: Dict[str, Tuple[int, int, int]] = {}
+        self._next_color_index = 1
+        self.brush_control_locations: Dict[str, Optional[ColorLocation]] = {
+            "fine": None,
+            "large": None,
+        }
+
+        self._palette_state = PaletteState()
+        self._preview_cache = PreviewCache()
+        self._plan_cache = PlanCache()
+        self._image_digests: Dict[int, str] = {}
+        self._folder_watcher = FolderWatcher(self)
+        self._folder_watcher.image_ready.connect(self._on_watched_image_ready)
+        self._ingest_thread = IngestThread(self._plan_cache, self)
+        self._ingest_thread.image_planned.connect(self._on_image_ingested)
+        self._ingest_thread.ingest_failed.connect(self._folder_watcher.retry)
         self._stop_flag = threading.Event()
         self._draw_thread: Optional[DrawingThread] = None
+        self._warm_up_thread: Optional[threading.Thread] = None
+        self._dots_per_second = 0.0
 
         self._setup_ui()
         self._update_dot_preview()
@@ -67,6 +104,9 @@ class DotDrawerApp(QWidget):
         right_layout.addWidget(self.img_list)
 
         buttons_layout = QHBoxLayout()
+        atlas_btn = QPushButton("Draw all as atlas")
+        atlas_btn.clicked.connect(self._on_atlas_clicked)
+        buttons_layout.addWidget(atlas_btn)
         right_layout.addLayout(buttons_layout)
 
         layout.addLayout(left_layout, 0)
@@ -96,6 +136,10 @@ class DotDrawerApp(QWidget):
         controls_col1.addWidget(brightness_label)
         controls_col1.addWidget(self.brightness_slider)
 
+        sweep_btn = QPushButton("Threshold sweep…")
+        sweep_btn.clicked.connect(self._on_sweep_clicked)
+        controls_col1.addWidget(sweep_btn)
+
         brush_label = QLabel("Brush size:")
         brush_label.setObjectName("sectionLabel")
         self.brush_spin = QSpinBox()
@@ -118,17 +162,9 @@ class DotDrawerApp(QWidget):
         color_group = QGroupBox("Color Locations")
         color_layout = QVBoxLayout()
 
-        self.dark_btn = QPushButton("Set Color 1 (Darkest)")
-        self.dark_btn.clicked.connect(lambda: self._pick_color_location("dark"))
-        color_layout.addWidget(self.dark_btn)
-
-        self.medium_btn = QPushButton("Set Color 2 (Medium)")
-        self.medium_btn.clicked.connect(lambda: self._pick_color_location("medium"))
-        color_layout.addWidget(self.medium_btn)
-
-        self.light_btn = QPushButton("Set Color 3 (Lightest)")
-        self.light_btn.clicked.connect(lambda: self._pick_color_location("light"))
-        color_layout.addWidget(self.light_btn)
+        self.add_color_btn = QPushButton("Add Palette Color")
+        self.add_color_btn.clicked.connect(self._add_palette_color)
+        color_layout.addWidget(self.add_color_btn)
 
         clear_btn = QPushButton("Clear All Colors")
         clear_btn.clicked.connect(self._clear_all_colors)
@@ -152,12 +188,37 @@ class DotDrawerApp(QWidget):
         clipboard_btn.clicked.connect(self.upload_from_clipboard)
         controls_col1.addWidget(clipboard_btn)
 
+        self.watch_btn = QPushButton("Watch folder…")
+        self.watch_btn.clicked.connect(self._toggle_watch_folder)
+        controls_col1.addWidget(self.watch_btn)
+
+        replay_btn = QPushButton("Replay saved plan")
+        replay_btn.clicked.connect(self.replay_plan)
+        controls_col1.addWidget(replay_btn)
+
         note = QLabel("Drawing will move your mouse and click.")
         note.setWordWrap(True)
         note.setStyleSheet(
             "color: #b71c1c; font-size: 11px; background: #fff3e0; border-radius: 5px; padding: 4px 8px; margin-top: 8px;"
         )
         controls_col1.addWidget(note)
+
+        self.draw_status_label = QLabel("Idle")
+        self.draw_status_label.setStyleSheet(
+            "color: #616161; font-size: 11px; margin-top: 4px;"
+        )
+        controls_col1.addWidget(self.draw_status_label)
+
+        self.draw_progress = QProgressBar()
+        self.draw_progress.setRange(0, 1)
+        self.draw_progress.setValue(0)
+        self.draw_progress.setFormat("%v / %m dots")
+        controls_col1.addWidget(self.draw_progress)
+
+        self.cancel_draw_btn = QPushButton("Cancel drawing")
+        self.cancel_draw_btn.setEnabled(False)
+        self.cancel_draw_btn.clicked.connect(self._cancel_drawing)
+        controls_col1.addWidget(self.cancel_draw_btn)
         controls_col1.addStretch()
 
         dot_preview_label = QLabel("Dot preview:")
@@ -166,6 +227,98 @@ class DotDrawerApp(QWidget):
         self.dot_preview.setFixedSize(80, 80)
         controls_col2.addWidget(dot_preview_label)
         controls_col2.addWidget(self.dot_preview)
+
+        planner_group = QGroupBox("Planning")
+        planner_layout = QVBoxLayout()
+
+        self.planner_combo = QComboBox()
+        self.planner_combo.addItem("Dot grid", "grid")
+        self.planner_combo.addItem("Quadtree (large brush fills)", "quadtree")
+        self.planner_combo.addItem("Contours (outlines only)", "contour")
+        self.planner_combo.addItem("Contours + scanline fill", "contour_fill")
+        self.planner_combo.addItem("Hex lattice (gap-free, sparse stamps)", "hex")
+        self.planner_combo.currentIndexChanged.connect(self._on_planner_changed)
+        planner_layout.addWidget(self.planner_combo)
+
+        large_brush_label = QLabel("Large brush size:")
+        self.large_brush_spin = QSpinBox()
+        self.large_brush_spin.setRange(2, 400)
+        self.large_brush_spin.setValue(40)
+        self.large_brush_spin.valueChanged.connect(self._on_settings_changed)
+        planner_layout.addWidget(large_brush_label)
+        planner_layout.addWidget(self.large_brush_spin)
+
+        tolerance_label = QLabel("Contour tolerance (px):")
+        self.tolerance_spin = QDoubleSpinBox()
+        self.tolerance_spin.setRange(0.0, 20.0)
+        self.tolerance_spin.setSingleStep(0.5)
+        self.tolerance_spin.setValue(1.5)
+        self.tolerance_spin.valueChanged.connect(self._on_settings_changed)
+        planner_layout.addWidget(tolerance_label)
+        planner_layout.addWidget(self.tolerance_spin)
+
+        self.dither_combo = QComboBox()
+        self.dither_combo.addItem("Hard threshold", "none")
+        self.dither_combo.addItem("Ordered dither (grid/hex)", "ordered")
+        self.dither_combo.addItem("Error diffusion (grid/hex)", "diffusion")
+        self.dither_combo.currentIndexChanged.connect(self._on_settings_changed)
+        planner_layout.addWidget(QLabel("Tone:"))
+        planner_layout.addWidget(self.dither_combo)
+
+        self.coverage_check = QCheckBox("Show brush coverage in previews")
+        self.coverage_check.toggled.connect(self._on_settings_changed)
+        planner_layout.addWidget(self.coverage_check)
+
+        self.progressive_check = QCheckBox("Progressive (coarse to fine)")
+        self.progressive_check.toggled.connect(self._on_settings_changed)
+        planner_layout.addWidget(self.progressive_check)
+
+        budget_label = QLabel("Dot budget (0 = unlimited):")
+        self.budget_spin = QSpinBox()
+        self.budget_spin.setRange(0, 1000000)
+        self.budget_spin.setSingleStep(500)
+        self.budget_spin.valueChanged.connect(self._on_settings_changed)
+        planner_layout.addWidget(budget_label)
+        planner_layout.addWidget(self.budget_spin)
+
+        fine_brush_btn = QPushButton("Set Fine Brush Location")
+        fine_brush_btn.clicked.connect(lambda: self._pick_brush_location("fine"))
+        planner_layout.addWidget(fine_brush_btn)
+
+        large_brush_btn = QPushButton("Set Large Brush Location")
+        large_brush_btn.clicked.connect(lambda: self._pick_brush_location("large"))
+        planner_layout.addWidget(large_brush_btn)
+
+        self.brush_status_label = QLabel("Brush locations: (not set)")
+        self.brush_status_label.setStyleSheet(
+            "color: #616161; font-size: 11px; margin-top: 4px;"
+        )
+        self.brush_status_label.setWordWrap(True)
+        planner_layout.addWidget(self.brush_status_label)
+
+        planner_group.setLayout(planner_layout)
+        controls_col2.addWidget(planner_group)
+
+        cleanup_group = QGroupBox("Cleanup")
+        cleanup_layout = QVBoxLayout()
+
+        self.cleanup_open_spin = QSpinBox()
+        self.cleanup_open_spin.setRange(0, 10)
+        self.cleanup_min_spin = QSpinBox()
+        self.cleanup_min_spin.setRange(0, 10000)
+        self.cleanup_holes_spin = QSpinBox()
+        self.cleanup_holes_spin.setRange(0, 10000)
+        for label, spin in (
+            ("Opening radius (px):", self.cleanup_open_spin),
+            ("Drop specks smaller than (px):", self.cleanup_min_spin),
+            ("Fill holes up to (px):", self.cleanup_holes_spin),
+        ):
+            spin.valueChanged.connect(self._on_settings_changed)
+            cleanup_layout.addWidget(QLabel(label))
+            cleanup_layout.addWidget(spin)
+
+        cleanup_group.setLayout(cleanup_layout)
+        controls_col2.addWidget(cleanup_group)
         controls_col2.addStretch()
 
         controls_grid.addLayout(controls_col1)
@@ -174,7 +327,14 @@ class DotDrawerApp(QWidget):
 
         return controls
 
-    def _pick_color_location(self, color_type):
+    def _add_palette_color(self):
+        if len(self.color_locations) >= MAX_PALETTE_COLORS:
+            return
+        color_type = f"color {self._next_color_index}"
+        if self._pick_color_location(color_type):
+            self._next_color_index += 1
+
+    def _pick_color_location(self, color_type) -> bool:
         self.hide()
         QApplication.processEvents()
         location = LocationPicker.get_location(
@@ -191,22 +351,74 @@ class DotDrawerApp(QWidget):
                 self.sampled_colors[color_type] = sampled_color
                 print(f"Sampled color for {color_type}: {sampled_color}")
 
-            self._update_color_status()
+            self._on_palette_changed()
+            return True
+        return False
+
+    def _pick_brush_location(self, kind: str):
+        self.hide()
+        QApplication.processEvents()
+        location = LocationPicker.get_location(
+            self, f"Click to set the {kind} brush size control"
+        )
+        self.show()
+        self.setFocus()
+
+        if location:
+            self.brush_control_locations[kind] = location
+            self._palette_state.active_brush = None
+            parts = [
+                f"{name.title()}: ({loc.x}, {loc.y})"
+                for name, loc in self.brush_control_locations.items()
+                if loc is not None
+            ]
+            self.brush_status_label.setText("Brush locations:\n" + "\n".join(parts))
             self._update_all_previews()
 
+    def _brush_locations(self) -> List[BrushLocation]:
+        sizes = {
+            "fine": self.brush_spin.value(),
+            "large": self.large_brush_spin.value(),
+        }
+        return [
+            BrushLocation(loc.x, loc.y, sizes[kind])
+            for kind, loc in self.brush_control_locations.items()
+            if loc is not None
+        ]
+
+    def _plan_settings(self) -> PlanSettings:
+        planner = self.planner_combo.currentData()
+        large_brush_px = 0
+        if planner == "quadtree" and all(self.brush_control_locations.values()):
+            large_brush_px = self.large_brush_spin.value()
+        return PlanSettings(
+            planner=planner,
+            large_brush_px=large_brush_px,
+            contour_tolerance=self.tolerance_spin.value(),
+            dither=self.dither_combo.currentData(),
+            progressive=self.progressive_check.isChecked(),
+            dot_budget=self.budget_spin.value(),
+            cleanup=CleanupSettings(
+                open_px=self.cleanup_open_spin.value(),
+                min_component_px=self.cleanup_min_spin.value(),
+                fill_holes_px=self.cleanup_holes_spin.value(),
+            ),
+        )
+
     def _clear_all_colors(self):
-        self.color_locations = {"dark": None, "medium": None, "light": None}
-        self.sampled_colors = {"dark": None, "medium": None, "light": None}
-        self._update_color_status()
-        self._update_all_previews()
+        self.color_locations = {}
+        self.sampled_colors = {}
+        self._next_color_index = 1
+        self._palette_state.active_color = None
+        self._on_palette_changed()
 
     def _update_color_status(self):
         status_parts = []
         active_colors = 0
 
-        for color_type in ["dark", "medium", "light"]:
+        for color_type in self._palette_by_luminance():
             loc = self.color_locations[color_type]
-            sampled = self.sampled_colors[color_type]
+            sampled = self.sampled_colors.get(color_type)
             if loc and sampled:
                 r, g, b = sampled
                 luminance = rgb_to_luminance(sampled)
@@ -224,6 +436,13 @@ class DotDrawerApp(QWidget):
                 status_parts
             )
             self.color_status_label.setText(status_text)
+        self.add_color_btn.setEnabled(len(self.color_locations) < MAX_PALETTE_COLORS)
+
+    def _palette_by_luminance(self) -> List[str]:
+        return sorted(
+            self.color_locations,
+            key=lambda name: rgb_to_luminance(self.sampled_colors.get(name, (0, 0, 0))),
+        )
 
     def focusInEvent(self, a0):
         super().focusInEvent(a0)
@@ -233,20 +452,87 @@ class DotDrawerApp(QWidget):
         self.setFocus()
         self.activateWindow()
         self.raise_()
-
-    def _generate_live_preview(self, img: Image.Image) -> QPixmap:
-        try:
-            threshold = self.threshold_slider.value()
-            brightness_offset = self.brightness_slider.value()
-            brush_px = self.brush_spin.value()
-
-            target_w, target_h = (
-                (self.selected_region.w, self.selected_region.h)
-                if self.selected_region
-                else (200, 200)
+        if self._warm_up_thread is None:
+            QTimer.singleShot(0, self._start_warm_up)
+
+    def closeEvent(self, a0):
+        self._folder_watcher.stop()
+        self._ingest_thread.stop()
+        super().closeEvent(a0)
+
+    def _start_warm_up(self):
+        self._warm_up_thread = threading.Thread(target=warm_up_imports, daemon=True)
+        self._warm_up_thread.start()
+
+    def _palette_key(self) -> tuple:
+        return tuple(
+            sorted(
+                (name, tuple(rgb))
+                for name, rgb in self.sampled_colors.items()
+                if rgb is not None
             )
+        )
 
-            result = process_image_for_multicolor_drawing(
+    def _on_palette_changed(self):
+        self._preview_cache.retain_palette(self._palette_key())
+        self._update_color_status()
+        self._update_all_previews()
+
+    def _plan_key_params(
+        self,
+        target_w: int,
+        target_h: int,
+        threshold: int,
+        brightness_offset: int,
+        brush_px: int,
+        settings: PlanSettings,
+    ) -> dict:
+        return {
+            "size": (target_w, target_h),
+            "threshold": threshold,
+            "brightness": brightness_offset,
+            "brush_px": brush_px,
+            "palette": self._palette_key(),
+            "settings": astuple(settings),
+        }
+
+    def _plan_cache_key(
+        self,
+        img: Image.Image,
+        target_w: int,
+        target_h: int,
+        threshold: int,
+        brightness_offset: int,
+        brush_px: int,
+        settings: PlanSettings,
+    ) -> str:
+        digest = self._image_digests.get(id(img))
+        if digest is None:
+            digest = self._image_digests[id(img)] = image_digest(img)
+        return self._plan_cache.key_for(
+            digest,
+            **self._plan_key_params(
+                target_w, target_h, threshold, brightness_offset, brush_px, settings
+            ),
+        )
+
+    def _cached_plan(
+        self,
+        img: Image.Image,
+        target_w: int,
+        target_h: int,
+        threshold: int,
+        brightness_offset: int,
+        brush_px: int,
+        settings: PlanSettings,
+    ):
+        key = self._plan_cache_key(
+            img, target_w, target_h, threshold, brightness_offset, brush_px, settings
+        )
+        with stage("plan cache load"):
+            plan = self._plan_cache.load(key)
+        if plan is None:
+            plan = process_image_for_multicolor_drawing(
                 img,
                 target_w,
                 target_h,
@@ -255,72 +541,140 @@ class DotDrawerApp(QWidget):
                 self.color_locations,
                 self.sampled_colors,
                 brightness_offset,
+                settings,
             )
+            if plan is not None:
+                with stage("plan cache store"):
+                    self._plan_cache.store(
+                        key, plan, brush_px=brush_px, settings=settings
+                    )
+        return plan
 
-            if result is None:
-                fallback = QPixmap(120, 120)
-                fallback.fill(Qt.GlobalColor.white)
-                return fallback
-
-            img_resized, color_dots, active_colors = result
-
-            final_w = img_resized.size[0]
-            final_h = img_resized.size[1]
+    def _preview_size(self) -> Tuple[int, int]:
+        if self.selected_region:
+            return self.selected_region.w, self.selected_region.h
+        return 200, 200
 
-            preview_img = Image.new("RGB", (final_w, final_h), (255, 255, 255))
-            dot_radius = max(1, brush_px // 3)
+    def _generate_live_preview(self, img: Image.Image) -> QPixmap:
+        with interaction("preview"):
+            return self._build_live_preview(img)
 
-            np.random.seed(42)
+    def _build_live_preview(self, img: Image.Image) -> QPixmap:
+        threshold = self.threshold_slider.value()
+        brightness_offset = self.brightness_slider.value()
+        brush_px = self.brush_spin.value()
+        settings = self._plan_settings()
+        coverage = self.coverage_check.isChecked()
 
-            def draw_dots_with_preview_color(dots, preview_color):
-                for x, y in dots:
-                    for dy in range(-dot_radius, dot_radius + 1):
-                        for dx in range(-dot_radius, dot_radius + 1):
-                            if dx * dx + dy * dy <= dot_radius * dot_radius:
-                                px = x + dx
-                                py = y + dy
-                                if (
-                                    0 <= px < preview_img.width
-                                    and 0 <= py < preview_img.height
-                                ):
-                                    preview_img.putpixel((px, py), preview_color)
+        target_w, target_h = self._preview_size()
 
-            stages = [
-                (color_name, dots) for color_name, dots in color_dots.items() if dots
-            ]
+        key = PreviewCache.make_key(
+            id(img),
+            (target_w, target_h),
+            threshold,
+            brightness_offset,
+            brush_px,
+            self._palette_key(),
+            (astuple(settings), coverage),
+        )
+        cached = self._preview_cache.get(key)
+        if cached is not None:
+            return cached
 
-            bg_color = None
-            bg_rgb = (255, 255, 255)
-            if stages:
-                most_common_stage = max(stages, key=lambda s: len(s[1]))
-                bg_color, bg_dots = most_common_stage
-                stages = [(c, d) for (c, d) in stages if c != bg_color]
+        disk_key = self._plan_cache_key(
+            img, target_w, target_h, threshold, brightness_offset, brush_px, settings
+        )
+        preview_path = None if coverage else self._plan_cache.preview_path(disk_key)
+        if preview_path is not None:
+            with stage("preview cache load"):
+                preview = QPixmap(preview_path)
+            if not preview.isNull():
+                self._preview_cache.put(key, preview)
+                return preview
+
+        preview = self._render_live_preview(
+            img,
+            target_w,
+            target_h,
+            threshold,
+            brightness_offset,
+            brush_px,
+            settings,
+            coverage,
+        )
+        if preview is not None:
+            self._preview_cache.put(key, preview)
+            if not coverage:
+                with stage("preview cache store"):
+                    preview.save(self._plan_cache.preview_target(disk_key), "PNG")
+            return preview
+
+        fallback = QPixmap(120, 120)
+        fallback.fill(Qt.GlobalColor.white)
+        return fallback
+
+    def _render_live_preview(
+        self,
+        img: Image.Image,
+        target_w: int,
+        target_h: int,
+        threshold: int,
+        brightness_offset: int,
+        brush_px: int,
+        settings: PlanSettings,
+        coverage: bool = False,
+    ) -> Optional[QPixmap]:
+        try:
+            from planners import coverage_overlay, rasterize_plan
 
-                if bg_color in active_colors:
-                    bg_rgb = active_colors[bg_color]["rgb"]
+            plan = self._cached_plan(
+                img,
+                target_w,
+                target_h,
+                threshold,
+                brightness_offset,
+                brush_px,
+                settings,
+            )
 
-            for color_name, dots in stages:
-                if color_name in active_colors:
-                    preview_color = active_colors[color_name]["rgb"]
-                else:
-                    preview_color = (0, 0, 0)
+            if plan is None:
+                return None
 
-                draw_dots_with_preview_color(dots, preview_color)
+            final_w = plan.width
+            final_h = plan.height
 
-            preview_img.thumbnail((120, 120), Image.Resampling.LANCZOS)
+            bg_rgb = (255, 255, 255)
+            if plan.background in plan.palette:
+                bg_rgb = plan.palette[plan.background]["rgb"]
+
+            with stage("rasterize"):
+                canvas = coverage_overlay(plan) if coverage else rasterize_plan(plan)
+
+            with stage("compose"):
+                preview_img = array_to_qimage(canvas)
+                if final_w > 120 or final_h > 120:
+                    preview_img = preview_img.scaled(
+                        120,
+                        120,
+                        Qt.AspectRatioMode.KeepAspectRatio,
+                        Qt.TransformationMode.SmoothTransformation,
+                    )
 
-            final_preview = Image.new("RGB", (120, 120), bg_rgb)
-            x_offset = (120 - preview_img.width) // 2
-            y_offset = (120 - preview_img.height) // 2
-            final_preview.paste(preview_img, (x_offset, y_offset))
+                final_preview = QPixmap(120, 120)
+                final_preview.fill(QColor(*bg_rgb))
+                painter = QPainter(final_preview)
+                painter.drawImage(
+                    (120 - preview_img.width()) // 2,
+                    (120 - preview_img.height()) // 2,
+                    preview_img,
+                )
+                painter.end()
 
-            return pil_to_qpixmap(final_preview)
+            return final_preview
 
         except Exception as e:
             print(f"Error generating preview: {e}")
-            fallback = QPixmap(120, 120)
-            fallback.fill(Qt.GlobalColor.white)
-            return fallback
+            return None
 
     def _update_all_previews(self):
         try:
@@ -342,6 +696,12 @@ class DotDrawerApp(QWidget):
         except Exception as e:
             print(f"Error updating previews: {e}")
 
+    def _on_planner_changed(self):
+        self.dither_combo.setEnabled(
+            self.planner_combo.currentData() in DITHER_PLANNERS
+        )
+        self._on_settings_changed()
+
     def _on_settings_changed(self):
         self._update_dot_preview()
         self._update_all_previews()
@@ -387,26 +747,15 @@ class DotDrawerApp(QWidget):
     def upload_from_clipboard(self):
         try:
             clipboard = QApplication.clipboard()
-            pixmap = clipboard.pixmap()
+            qimg = clipboard.image()
 
-            if pixmap.isNull():
+            if qimg.isNull():
                 QMessageBox.information(
                     self, "No Image", "No image found in clipboard."
                 )
                 return
 
-            qimg = pixmap.toImage()
-            if qimg.format() != qimg.Format_ARGB32:
-                qimg = qimg.convertToFormat(qimg.Format_ARGB32)
-
-            width = qimg.width()
-            height = qimg.height()
-            ptr = qimg.bits()
-            ptr.setsize(height * width * 4)
-
-            arr = np.array(ptr).reshape((height, width, 4))
-            arr = arr[:, :, [2, 1, 0, 3]]
-            img = Image.fromarray(arr, "RGBA")
+            img = qimage_to_pil(qimg)
 
             path = f"clipboard_image_{len(self.uploaded_images)}"
             self.uploaded_images.append((path, img))
@@ -429,18 +778,78 @@ class DotDrawerApp(QWidget):
         self.uploaded_images.append((path, img))
         self._add_image_list_item(path, img)
 
-    def _add_image_list_item(self, path: str, img: Image.Image):
+    def _toggle_watch_folder(self):
+        if self._folder_watcher.directory is not None:
+            self._folder_watcher.stop()
+            self.watch_btn.setText("Watch folder…")
+            return
+
+        directory = QFileDialog.getExistingDirectory(self, "Watch folder")
+        if not directory:
+            return
+        self._folder_watcher.watch(directory)
+        self.watch_btn.setText(f"Stop watching {directory.split('/')[-1]}")
+
+    def _on_watched_image_ready(self, path: str):
+        if any(p == path for p, _ in self.uploaded_images):
+            return
+        target_w, target_h = self._preview_size()
+        threshold = self.threshold_slider.value()
+        brightness_offset = self.brightness_slider.value()
+        brush_px = self.brush_spin.value()
+        settings = self._plan_settings()
+        self._ingest_thread.submit(
+            path,
+            {
+                "key": self._plan_key_params(
+                    target_w,
+                    target_h,
+                    threshold,
+                    brightness_offset,
+                    brush_px,
+                    settings,
+                ),
+                "width": target_w,
+                "height": target_h,
+                "threshold": threshold,
+                "brightness_offset": brightness_offset,
+                "brush_px": brush_px,
+                "settings": settings,
+                "color_locations": dict(self.color_locations),
+                "sampled_colors": dict(self.sampled_colors),
+            },
+        )
+
+    def _on_image_ingested(self, path: str, img: Image.Image, plan, digest: str):
+        if any(p == path for p, _ in self.uploaded_images):
+            return
+        self.uploaded_images.append((path, img))
+        widget = self._add_image_list_item(path, img, digest)
+        if plan is not None:
+            widget.set_stats(
+                f"{plan.stats['planner']}: {plan.event_count} events, "
+                f"{len(plan.palette)} colors"
+            )
+
+    def _add_image_list_item(self, path: str, img: Image.Image, digest: str = None):
+        self._image_digests[id(img)] = digest or image_digest(img, path)
         item = QListWidgetItem()
         widget = ImageListWidget(path, img, self)
         widget.draw_requested.connect(self._on_draw_clicked)
         widget.remove_requested.connect(self._remove_image)
+        widget.save_plan_requested.connect(self._save_plan)
         widget.update_preview(self._generate_live_preview(img))
 
         item.setSizeHint(widget.sizeHint())
         self.img_list.addItem(item)
         self.img_list.setItemWidget(item, widget)
+        return widget
 
     def _remove_image(self, image_path: str):
+        for p, im in self.uploaded_images:
+            if p == image_path:
+                self._preview_cache.invalidate_image(id(im))
+                self._image_digests.pop(id(im), None)
         self.uploaded_images = [
             (p, im) for (p, im) in self.uploaded_images if p != image_path
         ]
@@ -452,12 +861,120 @@ class DotDrawerApp(QWidget):
                 self.img_list.takeItem(i)
                 break
 
-    def _on_draw_clicked(self, image_path: str):
+    def _save_plan(self, image_path: str):
+        from plan_file import save_plan
+
         img = next((im for (p, im) in self.uploaded_images if p == image_path), None)
         if img is None:
             QMessageBox.warning(self, "Error", "Image not found.")
             return
 
+        region = self._drawing_region()
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save plan", "", "Dot plans (*.totsplan)"
+        )
+        if not path:
+            return
+
+        settings = self._plan_settings()
+        plan = self._cached_plan(
+            img,
+            region.w,
+            region.h,
+            self.threshold_slider.value(),
+            self.brightness_slider.value(),
+            self.brush_spin.value(),
+            settings,
+        )
+        if plan is None:
+            QMessageBox.warning(self, "Error", "Could not plan this image.")
+            return
+
+        try:
+            save_plan(
+                path,
+                plan,
+                region,
+                self.brush_spin.value(),
+                settings,
+                self.color_locations,
+                self._brush_locations(),
+                threshold=self.threshold_slider.value(),
+                brightness_offset=self.brightness_slider.value(),
+            )
+            self.draw_status_label.setText(f"Saved plan with {plan.event_count} events")
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Could not save plan: {e}")
+
+    def replay_plan(self):
+        from plan_file import load_plan, saved_locations, unplaced_colors
+
+        if self._draw_thread is not None and self._draw_thread.isRunning():
+            QMessageBox.information(
+                self, "Drawing in progress", "Cancel the current drawing first."
+            )
+            return
+
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Replay plan", "", "Dot plans (*.totsplan)"
+        )
+        if not path:
+            return
+
+        try:
+            plan, header = load_plan(path)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Could not open plan: {e}")
+            return
+
+        color_locations, brush_locations = saved_locations(header)
+        swatches = "saved with the plan"
+        if not color_locations:
+            color_locations, brush_locations = (
+                self.color_locations,
+                self._brush_locations(),
+            )
+            swatches = "current palette (not saved with this plan)"
+        missing = unplaced_colors(plan, color_locations)
+        if missing:
+            QMessageBox.warning(
+                self,
+                "Missing Colors",
+                f"This plan has no swatch location for: {', '.join(missing)}",
+            )
+            return
+
+        region = self._drawing_region()
+        scale = min(region.w / max(plan.width, 1), region.h / max(plan.height, 1))
+        confirm = QMessageBox.question(
+            self,
+            "Confirm Replay",
+            f"Replay '{path.split('/')[-1]}' ({plan.event_count} events)?\n\n"
+            f"Region: x={region.x}, y={region.y}, w={region.w}, h={region.h}\n"
+            f"Scale: {scale:.2f}\n"
+            f"Swatches: {swatches}",
+        )
+        if confirm != QMessageBox.StandardButton.Yes:
+            return
+
+        self._start_drawing(
+            DrawingThread(
+                None,
+                region,
+                header["brush_px"],
+                0,
+                self._stop_flag,
+                self,
+                color_locations,
+                0,
+                self._palette_state,
+                brush_locations,
+                plan=plan,
+                scale=scale,
+            )
+        )
+
+    def _drawing_region(self) -> Region:
         region = self.selected_region
         if region is None:
             screen = QApplication.primaryScreen().geometry()
@@ -470,6 +987,170 @@ class DotDrawerApp(QWidget):
             self.region_info_label.setText(
                 f"Region (auto): x={region.x}, y={region.y}, w={region.w}, h={region.h}"
             )
+        return region
+
+    def _on_sweep_clicked(self):
+        from sweep import sweep_grid
+        from gui.sweep_dialog import SweepDialog
+
+        if not self.uploaded_images:
+            QMessageBox.information(self, "No Images", "Upload an image first.")
+            return
+
+        img = self.uploaded_images[0][1]
+        item = self.img_list.currentItem()
+        if item is not None:
+            widget = self.img_list.itemWidget(item)
+            img = next(
+                (im for (p, im) in self.uploaded_images if p == widget.image_path), img
+            )
+
+        threshold = self.threshold_slider.value()
+        brightness = self.brightness_slider.value()
+        thresholds = sorted(
+            {
+                min(
+                    max(threshold + delta, self.threshold_slider.minimum()),
+                    self.threshold_slider.maximum(),
+                )
+                for delta in (-48, -24, 0, 24, 48)
+            }
+        )
+        brightnesses = sorted(
+            {
+                min(
+                    max(brightness + delta, self.brightness_slider.minimum()),
+                    self.brightness_slider.maximum(),
+                )
+                for delta in (-40, -20, 0, 20, 40)
+            }
+        )
+
+        width, height = self._preview_size()
+        with interaction("threshold sweep"):
+            result = sweep_grid(
+                img,
+                width,
+                height,
+                self.brush_spin.value(),
+                thresholds,
+                brightnesses,
+                self.color_locations,
+                self.sampled_colors,
+            )
+        if result is None:
+            QMessageBox.warning(self, "Sweep failed", "Could not process the image.")
+            return
+
+        dialog = SweepDialog(
+            result, (threshold, brightness), self._dots_per_second, self
+        )
+        dialog.settings_chosen.connect(self._apply_sweep_settings)
+        dialog.exec_()
+
+    def _apply_sweep_settings(self, threshold: int, brightness: int):
+        self.threshold_slider.setValue(threshold)
+        self.brightness_slider.setValue(brightness)
+
+    def _on_atlas_clicked(self):
+        from atlas import atlas_layout, merge_plans
+
+        if self._draw_thread is not None and self._draw_thread.isRunning():
+            QMessageBox.information(
+                self, "Drawing in progress", "Cancel the current drawing first."
+            )
+            return
+        if not self.uploaded_images:
+            QMessageBox.information(self, "No Images", "Upload some images first.")
+            return
+
+        region = self._drawing_region()
+        brush_px = self.brush_spin.value()
+        threshold = self.threshold_slider.value()
+        brightness_offset = self.brightness_slider.value()
+        settings = self._plan_settings()
+
+        cell_settings = replace(settings, dot_budget=0)
+
+        images = [img for _, img in self.uploaded_images]
+        cells = atlas_layout([img.size for img in images], region.w, region.h)
+        plans = []
+        offsets = []
+        for img, cell in zip(images, cells):
+            plan = self._cached_plan(
+                img,
+                cell.w,
+                cell.h,
+                threshold,
+                brightness_offset,
+                brush_px,
+                cell_settings,
+            )
+            if plan is None:
+                continue
+            plans.append(plan)
+            offsets.append(
+                (
+                    cell.x + (cell.w - plan.width) // 2,
+                    cell.y + (cell.h - plan.height) // 2,
+                )
+            )
+        if not plans:
+            QMessageBox.warning(self, "Error", "Could not plan these images.")
+            return
+
+        atlas = merge_plans(plans, offsets, region.w, region.h, settings.dot_budget)
+        budget_info = ""
+        if "budget_dropped" in atlas.stats:
+            budget_info = f"\nDot budget dropped {atlas.stats['budget_dropped']} events"
+        separate_stages = sum(
+            len({stage.color for stage in plan.drawn_stages()}) for plan in plans
+        )
+        atlas_stages = len({stage.color for stage in atlas.drawn_stages()})
+        confirm = QMessageBox.question(
+            self,
+            "Confirm Atlas Drawing",
+            f"Draw {len(plans)} images as one atlas?\n\n"
+            f"Region: x={region.x}, y={region.y}, w={region.w}, h={region.h}\n"
+            f"Cell size: {cells[0].w}x{cells[0].h}\n"
+            f"{atlas.event_count} input events, "
+            f"{atlas_stages} color passes instead of {separate_stages}\n"
+            f"Background: {atlas.background or 'none'}"
+            f"{budget_info}",
+        )
+        if confirm != QMessageBox.StandardButton.Yes:
+            return
+
+        self._start_drawing(
+            DrawingThread(
+                None,
+                region,
+                brush_px,
+                threshold,
+                self._stop_flag,
+                self,
+                self.color_locations,
+                brightness_offset,
+                self._palette_state,
+                self._brush_locations(),
+                settings,
+                atlas,
+            )
+        )
+
+    def _on_draw_clicked(self, image_path: str):
+        if self._draw_thread is not None and self._draw_thread.isRunning():
+            QMessageBox.information(
+                self, "Drawing in progress", "Cancel the current drawing first."
+            )
+            return
+
+        img = next((im for (p, im) in self.uploaded_images if p == image_path), None)
+        if img is None:
+            QMessageBox.warning(self, "Error", "Image not found.")
+            return
+
+        region = self._drawing_region()
 
         brush_px = self.brush_spin.value()
         threshold = self.threshold_slider.value()
@@ -485,43 +1166,68 @@ class DotDrawerApp(QWidget):
             color_info = "\nColors: Black on white background (default)"
         else:
             color_info = f"\nUsing {active_color_count} selected color(s):"
-            for color_type in ["dark", "medium", "light"]:
+            for color_type in self._palette_by_luminance():
                 loc = self.color_locations[color_type]
-                sampled = self.sampled_colors[color_type]
+                sampled = self.sampled_colors.get(color_type)
                 if loc and sampled:
                     r, g, b = sampled
                     luminance = rgb_to_luminance(sampled)
                     color_info += f"\n  {color_type.title()}: RGB({r},{g},{b}) L={luminance:.0f} at ({loc.x},{loc.y})"
 
+        settings = self._plan_settings()
+        bg_color_info = ""
+        plan_info = ""
+        plan = None
         try:
-            result = process_image_for_multicolor_drawing(
+            plan = self._cached_plan(
                 img,
                 region.w,
                 region.h,
                 threshold,
-                brush_px,
-                self.color_locations,
-                self.sampled_colors,
                 brightness_offset,
+                brush_px,
+                settings,
             )
 
-            bg_color_info = ""
-            if result is not None:
-                img_resized, color_dots, active_colors = result
-
-                stages = [
-                    (color_name, dots)
-                    for color_name, dots in color_dots.items()
-                    if dots
-                ]
-
-                if stages:
-                    most_common_stage = max(stages, key=lambda s: len(s[1]))
-                    bg_color, bg_dots = most_common_stage
-
-                    if bg_color in active_colors:
-                        bg_rgb = active_colors[bg_color]["rgb"]
-                        bg_color_info = f"\nBackground color: {bg_color} (RGB{bg_rgb})"
+            if plan is not None:
+                if plan.background in plan.palette:
+                    bg_rgb = plan.palette[plan.background]["rgb"]
+                    bg_color_info = (
+                        f"\nBackground color: {plan.background} (RGB{bg_rgb})"
+                    )
+                plan_info = (
+                    f"\nPlanner: {plan.stats['planner']}, "
+                    f"{plan.stats['events']} input events "
+                    f"(grid would need {plan.stats['grid_events']})"
+                )
+                if plan.stats["planner"].startswith("contour"):
+                    accuracy = measure_plan_accuracy(
+                        plan,
+                        img,
+                        region.w,
+                        region.h,
+                        threshold,
+                        brush_px,
+                        self.color_locations,
+                        self.sampled_colors,
+                        brightness_offset,
+                        settings,
+                    )
+                    if accuracy is not None:
+                        plan_info += f", {accuracy:.1%} pixel accuracy"
+                if "cleanup_removed" in plan.stats:
+                    removed = plan.stats["cleanup_removed"]
+                    verb = "removed" if removed > 0 else "added"
+                    plan_info += f"\nCleanup {verb} {abs(removed)} events"
+                if "budget_dropped" in plan.stats:
+                    plan_info += (
+                        f"\nDot budget dropped {plan.stats['budget_dropped']} events"
+                    )
+                if "dither_ignored" in plan.stats:
+                    plan_info += (
+                        f"\n{plan.stats['dither_ignored'].capitalize()} dithering "
+                        "needs the grid or hex planner; using a hard threshold"
+                    )
 
         except Exception:
             bg_color_info = ""
@@ -534,22 +1240,66 @@ class DotDrawerApp(QWidget):
             f"Brush size: {brush_px}\n"
             f"Threshold: {threshold}\n"
             f"Brightness offset: {brightness_offset}"
-            f"{color_info}{bg_color_info}",
+            f"{color_info}{bg_color_info}{plan_info}",
         )
 
         if confirm != QMessageBox.StandardButton.Yes:
             return
 
+        self._start_drawing(
+            DrawingThread(
+                img,
+                region,
+                brush_px,
+                threshold,
+                self._stop_flag,
+                self,
+                self.color_locations,
+                brightness_offset,
+                self._palette_state,
+                self._brush_locations(),
+                settings,
+                plan,
+            )
+        )
+
+    def _start_drawing(self, thread: DrawingThread):
         self._stop_flag.clear()
+        self._draw_thread = thread
+        self._draw_thread.progress_changed.connect(self._on_draw_progress)
+        self._draw_thread.state_changed.connect(self.draw_status_label.setText)
+        self._draw_thread.beep_requested.connect(QApplication.beep)
+        self._draw_thread.drawing_finished.connect(self._on_draw_finished)
+        self.draw_progress.setRange(0, 1)
+        self.draw_progress.setValue(0)
+        self.cancel_draw_btn.setEnabled(True)
+        self._draw_thread.start()
 
-        self._draw_thread = DrawingThread(
-            img,
-            region,
-            brush_px,
-            threshold,
-            self._stop_flag,
-            self,
-            self.color_locations,
-            brightness_offset,
+    def _cancel_drawing(self):
+        if self._draw_thread is not None:
+            self._draw_thread.request_stop()
+        else:
+            self._stop_flag.set()
+        self.draw_status_label.setText("Cancelling…")
+
+    def _on_draw_progress(self, drawn: int, total: int, eta: float):
+        self.draw_progress.setRange(0, max(total, 1))
+        self.draw_progress.setValue(drawn)
+        if eta >= 0 and drawn < total:
+            minutes, seconds = divmod(int(eta), 60)
+            self.draw_progress.setFormat(f"%v / %m dots — ETA {minutes}:{seconds:02d}")
+        else:
+            self.draw_progress.setFormat("%v / %m dots")
+
+    def _on_draw_finished(self, telemetry: dict):
+        self.cancel_draw_btn.setEnabled(False)
+        print(
+            f"Drawing telemetry: {telemetry['dots_drawn']}/{telemetry['total_dots']} dots "
+            f"in {telemetry['elapsed']:.1f}s"
         )
-        self._draw_thread.start()
+        if "stop_latency" in telemetry:
+            print(
+                f"Stopped {telemetry['stop_latency'] * 1000:.1f} ms after the request"
+            )
+        if telemetry.get("dots_drawn") and telemetry.get("elapsed"):
+            self._dots_per_second = telemetry["dots_drawn"] / telemetry["elapsed"]
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from typing import Optional
+from PyQt5.QtGui import QPixmap
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class PreviewCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[tuple, QPixmap]" = OrderedDict()
+
+    @staticmethod
+    def make_key(
+        image_id, region_size, threshold, brightness, brush, palette, settings
+    ) -> tuple:
+        return (image_id, region_size, threshold, brightness, brush, palette, settings)
+
+    @staticmethod
+    def _size_of(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def get(self, key: tuple) -> Optional[QPixmap]:
+        pixmap = self._entries.get(key)
+        if pixmap is not None:
+            self._entries.move_to_end(key)
+        return pixmap
+
+    def put(self, key: tuple, pixmap: QPixmap):
+        size = self._size_of(pixmap)
+        if size > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = pixmap
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+
+    def _discard(self, key: tuple):
+        pixmap = self._entries.pop(key, None)
+        if pixmap is not None:
+            self.total_bytes -= self._size_of(pixmap)
+
+    def invalidate_image(self, image_id):
+        for key in [k for k in self._entries if k[0] == image_id]:
+            self._discard(key)
+
+    def retain_palette(self, palette):
+        for key in [k for k in self._entries if k[5] != palette]:
+            self._discard(key)
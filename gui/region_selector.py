@@ -1,66 +1,68 @@
-import time
-
 from typing import Optional
 from PyQt5.QtCore import Qt, QRect, QPoint
-from PyQt5.QtGui import QPainter, QColor
-from PyQt5.QtWidgets import QWidget, QApplication
+from PyQt5.QtGui import QPainter, QColor, QRegion
+from gui.screen_overlay import ScreenOverlay
 from models import Region
 
 
-class RegionSelector(QWidget):
+class RegionSelector(ScreenOverlay):
     def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWindowFlags(
-            Qt.WindowType(
-                Qt.WindowType.WindowStaysOnTopHint
-                | Qt.WindowType.FramelessWindowHint
-                | Qt.WindowType.Dialog
-            )
-        )
-        self.setWindowState(
-            self.windowState() | Qt.WindowState(Qt.WindowState.WindowFullScreen)
-        )
-        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.setCursor(Qt.CursorShape.CrossCursor)
+        super().__init__(parent, shade=120)
         self._start = QPoint()
         self._end = QPoint()
         self._rubber = False
         self.selected_rect: Optional[QRect] = None
 
+    def _rubber_rect(self) -> QRect:
+        return QRect(self._start, self._end).normalized()
+
     def paintEvent(self, a0):
         painter = QPainter(self)
-        painter.setPen(QColor(30, 144, 255))
-        painter.fillRect(self.rect(), QColor(0, 0, 0, 120))
+        area = a0.rect()
+        self.paint_shade(painter, area)
         if self._rubber:
-            r = QRect(self._start, self._end).normalized()
-            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Clear)
-            painter.fillRect(r, QColor(0, 0, 0, 0))
-            painter.setCompositionMode(
-                QPainter.CompositionMode.CompositionMode_SourceOver
-            )
-            painter.setPen(QColor(30, 144, 255))
-            painter.drawRect(r)
+            r = self._rubber_rect()
+            if r.intersects(area):
+                painter.setCompositionMode(
+                    QPainter.CompositionMode.CompositionMode_Clear
+                )
+                painter.fillRect(r.intersected(area), QColor(0, 0, 0, 0))
+                painter.setCompositionMode(
+                    QPainter.CompositionMode.CompositionMode_SourceOver
+                )
+                painter.setPen(QColor(30, 144, 255))
+                painter.drawRect(r)
+        self.paint_loupe(painter)
 
     def mousePressEvent(self, a0):
         self._start = self._end = a0.pos()
         self._rubber = True
-        self.update()
+        self.track_cursor(a0.pos(), QRegion(self._rubber_rect().adjusted(-2, -2, 2, 2)))
 
     def mouseMoveEvent(self, a0):
+        dirty = QRegion()
         if self._rubber:
+            dirty = dirty.united(self._rubber_rect().adjusted(-2, -2, 2, 2))
             self._end = a0.pos()
-            self.update()
+            dirty = dirty.united(self._rubber_rect().adjusted(-2, -2, 2, 2))
+        self.track_cursor(a0.pos(), dirty)
 
     def mouseReleaseEvent(self, a0):
         self._end = a0.pos()
         self._rubber = False
-        self.selected_rect = QRect(self._start, self._end).normalized()
+        self.selected_rect = self._rubber_rect()
         self.close()
 
+    def keyPressEvent(self, a0):
+        if a0.key() == Qt.Key.Key_Escape:
+            self._rubber = False
+            self.selected_rect = None
+            self.close()
+        super().keyPressEvent(a0)
+
     @staticmethod
     def get_region(parent=None) -> Optional[Region]:
         sel = RegionSelector(parent)
-        sel.show()
         sel.exec_()
         if sel.selected_rect is not None:
             try:
@@ -79,12 +81,3 @@ class RegionSelector(QWidget):
                 int(r.height() * dpr),
             )
         return None
-
-    def exec_(self):
-        self.show()
-        self.activateWindow()
-        self.raise_()
-
-        while self.isVisible():
-            QApplication.processEvents()
-            time.sleep(0.01)
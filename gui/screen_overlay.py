@@ -0,0 +1,109 @@
+from typing import Optional
+from PyQt5.QtCore import Qt, QRect, QPoint, QEventLoop
+from PyQt5.QtGui import QPainter, QColor, QCursor, QPixmap, QRegion
+from PyQt5.QtWidgets import QWidget, QApplication
+
+LOUPE_SIZE = 120
+LOUPE_ZOOM = 8
+LOUPE_OFFSET = 24
+
+
+class ScreenOverlay(QWidget):
+    def __init__(self, parent=None, shade: int = 100):
+        super().__init__(parent)
+        self.setWindowFlags(
+            Qt.WindowType(
+                Qt.WindowType.WindowStaysOnTopHint
+                | Qt.WindowType.FramelessWindowHint
+                | Qt.WindowType.Dialog
+            )
+        )
+        self.setWindowState(
+            self.windowState() | Qt.WindowState(Qt.WindowState.WindowFullScreen)
+        )
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.setCursor(Qt.CursorShape.CrossCursor)
+        self.setMouseTracking(True)
+        self.shade = QColor(0, 0, 0, shade)
+        self._loop: Optional[QEventLoop] = None
+        self._cursor = QPoint(-1, -1)
+        self._capture: Optional[QPixmap] = None
+        self._capture_origin = QPoint()
+        self._capture_scale = 1.0
+        self._grab_screen()
+
+    def _grab_screen(self):
+        screen = QApplication.screenAt(QCursor.pos()) or QApplication.primaryScreen()
+        if screen is None:
+            return
+        capture = screen.grabWindow(0)
+        if capture.isNull():
+            return
+        geometry = screen.geometry()
+        self._capture = capture
+        self._capture_origin = geometry.topLeft()
+        self._capture_scale = capture.width() / max(geometry.width(), 1)
+
+    def loupe_rect(self, pos: QPoint) -> QRect:
+        x = pos.x() + LOUPE_OFFSET
+        y = pos.y() + LOUPE_OFFSET
+        if x + LOUPE_SIZE > self.width():
+            x = pos.x() - LOUPE_OFFSET - LOUPE_SIZE
+        if y + LOUPE_SIZE > self.height():
+            y = pos.y() - LOUPE_OFFSET - LOUPE_SIZE
+        return QRect(x, y, LOUPE_SIZE, LOUPE_SIZE)
+
+    def track_cursor(self, pos: QPoint, dirty: QRegion = None):
+        dirty = QRegion() if dirty is None else dirty
+        if self._capture is not None:
+            if self._cursor.x() >= 0:
+                dirty = dirty.united(
+                    self.loupe_rect(self._cursor).adjusted(-2, -2, 2, 2)
+                )
+            dirty = dirty.united(self.loupe_rect(pos).adjusted(-2, -2, 2, 2))
+        self._cursor = QPoint(pos)
+        if not dirty.isEmpty():
+            self.update(dirty)
+
+    def paint_shade(self, painter: QPainter, area: QRect):
+        painter.fillRect(area, self.shade)
+
+    def paint_loupe(self, painter: QPainter):
+        if self._capture is None or self._cursor.x() < 0:
+            return
+        target = self.loupe_rect(self._cursor)
+        global_pos = self.mapToGlobal(self._cursor) - self._capture_origin
+        span = LOUPE_SIZE // LOUPE_ZOOM
+        cx = int(global_pos.x() * self._capture_scale)
+        cy = int(global_pos.y() * self._capture_scale)
+        source = QRect(cx - span // 2, cy - span // 2, span, span)
+
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+        painter.fillRect(target, QColor(0, 0, 0))
+        painter.drawPixmap(target, self._capture, source)
+        cell = QRect(
+            target.x() + (span // 2) * LOUPE_ZOOM,
+            target.y() + (span // 2) * LOUPE_ZOOM,
+            LOUPE_ZOOM,
+            LOUPE_ZOOM,
+        )
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.setPen(QColor(255, 255, 0))
+        painter.drawRect(cell)
+        painter.setPen(QColor(30, 144, 255))
+        painter.drawRect(target.adjusted(0, 0, -1, -1))
+
+    def closeEvent(self, a0):
+        super().closeEvent(a0)
+        if self._loop is not None:
+            self._loop.quit()
+
+    def exec_(self):
+        self.show()
+        self.activateWindow()
+        self.raise_()
+
+        self._loop = QEventLoop()
+        if self.isVisible():
+            self._loop.exec_()
+        self._loop = None
@@ -0,0 +1,95 @@
+import ctypes
+import ctypes.util
+import sys
+import threading
+from typing import Callable, Optional
+
+POLL_SECONDS = 0.005
+VK_ESCAPE = 0x1B
+MAC_ESCAPE_KEYCODE = 53
+XK_ESCAPE = 0xFF1B
+
+
+def _windows_probe():
+    user32 = ctypes.windll.user32
+    return lambda: bool(user32.GetAsyncKeyState(VK_ESCAPE) & 0x8000), None
+
+
+def _mac_probe():
+    quartz = ctypes.cdll.LoadLibrary(ctypes.util.find_library("ApplicationServices"))
+    quartz.CGEventSourceKeyState.restype = ctypes.c_bool
+    quartz.CGEventSourceKeyState.argtypes = [ctypes.c_int32, ctypes.c_uint16]
+    return lambda: quartz.CGEventSourceKeyState(0, MAC_ESCAPE_KEYCODE), None
+
+
+def _x11_probe():
+    path = ctypes.util.find_library("X11")
+    if path is None:
+        return None, None
+    xlib = ctypes.cdll.LoadLibrary(path)
+    xlib.XOpenDisplay.restype = ctypes.c_void_p
+    xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    xlib.XKeysymToKeycode.restype = ctypes.c_ubyte
+    xlib.XKeysymToKeycode.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+    xlib.XQueryKeymap.argtypes = [ctypes.c_void_p, ctypes.c_char * 32]
+    xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+
+    display = xlib.XOpenDisplay(None)
+    if not display:
+        return None, None
+    keycode = xlib.XKeysymToKeycode(display, XK_ESCAPE)
+    keys = (ctypes.c_char * 32)()
+
+    def pressed() -> bool:
+        xlib.XQueryKeymap(display, keys)
+        return bool(keys.raw[keycode // 8] & (1 << (keycode % 8)))
+
+    return pressed, lambda: xlib.XCloseDisplay(display)
+
+
+def escape_probe():
+    try:
+        if sys.platform == "win32":
+            return _windows_probe()
+        if sys.platform == "darwin":
+            return _mac_probe()
+        return _x11_probe()
+    except Exception as e:
+        print(f"Global stop hotkey unavailable: {e}")
+        return None, None
+
+
+class StopHotkey:
+    def __init__(self, on_press: Callable[[], None]):
+        self.on_press = on_press
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        ready = threading.Event()
+        available = []
+
+        def poll():
+            pressed, close = escape_probe()
+            available.append(pressed is not None)
+            ready.set()
+            if pressed is None:
+                return
+            try:
+                while not self._done.wait(POLL_SECONDS):
+                    if pressed():
+                        self.on_press()
+                        return
+            finally:
+                if close is not None:
+                    close()
+
+        self._thread = threading.Thread(target=poll, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return available[0]
+
+    def stop(self):
+        self._done.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,77 @@
+import numpy as np
+from PyQt5.QtCore import Qt, QSize, pyqtSignal
+from PyQt5.QtGui import QIcon, QPixmap
+from PyQt5.QtWidgets import QDialog, QGridLayout, QLabel, QToolButton
+from gui.drawing_thread import estimate_draw_seconds
+from sweep import SweepResult
+from utils import array_to_qimage
+
+CELL_SIZE = 140
+
+
+class SweepDialog(QDialog):
+    settings_chosen = pyqtSignal(int, int)
+
+    def __init__(
+        self,
+        result: SweepResult,
+        current: tuple,
+        rate: float = 0.0,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.setWindowTitle("Threshold × brightness sweep")
+        self.result = result
+
+        table = np.full((256, 3), 255, dtype=np.uint8)
+        for index, name in enumerate(result.names):
+            table[index] = result.palette[name]["rgb"]
+
+        layout = QGridLayout(self)
+        for col, brightness in enumerate(result.brightnesses):
+            header = QLabel(f"Brightness {brightness:+d}")
+            header.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            layout.addWidget(header, 0, col + 1)
+
+        for row, threshold in enumerate(result.thresholds):
+            layout.addWidget(QLabel(f"Threshold {threshold}"), row + 1, 0)
+            for col, brightness in enumerate(result.brightnesses):
+                events = int(result.events[row, col])
+                stages = len(
+                    set(np.unique(result.grids[row, col]).tolist())
+                    - {255, self._background_index(row, col)}
+                )
+                minutes, seconds = divmod(
+                    int(estimate_draw_seconds(events, stages, rate)), 60
+                )
+
+                button = QToolButton()
+                button.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextUnderIcon)
+                button.setIcon(QIcon(self._cell_pixmap(table, row, col)))
+                button.setIconSize(QSize(CELL_SIZE, CELL_SIZE))
+                button.setText(f"{events} dots · ~{minutes}:{seconds:02d}")
+                button.setCheckable(True)
+                button.setChecked((threshold, brightness) == tuple(current))
+                button.clicked.connect(
+                    lambda _, t=threshold, b=brightness: self._choose(t, b)
+                )
+                layout.addWidget(button, row + 1, col + 1)
+
+    def _background_index(self, row: int, col: int) -> int:
+        background = self.result.backgrounds[row][col]
+        return self.result.names.index(background) if background else -1
+
+    def _cell_pixmap(self, table: np.ndarray, row: int, col: int) -> QPixmap:
+        image = array_to_qimage(table[self.result.grids[row, col]])
+        return QPixmap.fromImage(
+            image.scaled(
+                CELL_SIZE,
+                CELL_SIZE,
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.FastTransformation,
+            )
+        )
+
+    def _choose(self, threshold: int, brightness: int):
+        self.settings_chosen.emit(threshold, brightness)
+        self.accept()
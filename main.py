@@ -1,13 +1,122 @@
+import time
+
+_START = time.perf_counter()
+
 import sys
+import argparse
 
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
 from gui.main_window import DotDrawerApp
+from utils import HEAVY_MODULES
+
+
+def _print_startup_report():
+    elapsed = (time.perf_counter() - _START) * 1000
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"Startup: window shown after {elapsed:.0f} ms")
+    print(f"Startup: heavy modules loaded before first paint: {loaded or 'none'}")
+    print("Startup: run with `python -X importtime main.py` for a per-module breakdown")
+
+
+def replay(args) -> int:
+    import threading
+
+    from gui.drawing_thread import DrawingThread
+    from models import Region
+    from plan_file import load_plan, saved_locations, unplaced_colors
+
+    plan, header = load_plan(args.replay)
+    color_locations, brush_locations = saved_locations(header)
+    missing = unplaced_colors(plan, color_locations)
+    if missing:
+        print(
+            f"Replay: the plan has no saved swatch for {', '.join(missing)}; "
+            "re-save it from the app with every colour location set"
+        )
+        return 2
+    if args.region:
+        region = Region(*args.region)
+    elif header["region"]:
+        region = Region(**header["region"])
+    else:
+        print("Replay: the plan has no saved region, pass --region X Y W H")
+        return 2
+
+    thread = DrawingThread(
+        None,
+        region,
+        header["brush_px"],
+        0,
+        threading.Event(),
+        color_locations=color_locations,
+        brush_locations=brush_locations,
+        plan=plan,
+        offset=tuple(args.offset),
+        scale=args.scale,
+    )
+    thread.state_changed.connect(lambda state: print(f"Replay: {state}"))
+
+    def report(telemetry: dict):
+        print(
+            f"Replay: drew {telemetry['dots_drawn']}/{telemetry['total_dots']} events"
+        )
+        if "stop_latency" in telemetry:
+            latency = telemetry["stop_latency"] * 1000
+            print(f"Replay: stopped {latency:.1f} ms after the request")
+
+    thread.drawing_finished.connect(report)
+    thread.run()
+    return 0
 
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Dot Drawer")
+    parser.add_argument(
+        "--startup-report",
+        action="store_true",
+        help="print time-to-window and which heavy modules were imported",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time each planning and preview stage and dump cProfile stats "
+        "(same as setting TOTS_PROFILE=1)",
+    )
+    parser.add_argument("--replay", metavar="PLAN", help="draw a saved plan file")
+    parser.add_argument(
+        "--region",
+        nargs=4,
+        type=int,
+        metavar=("X", "Y", "W", "H"),
+        help="screen region to replay into (defaults to the saved region)",
+    )
+    parser.add_argument(
+        "--offset",
+        nargs=2,
+        type=int,
+        default=(0, 0),
+        metavar=("DX", "DY"),
+        help="shift the replayed plan by this many pixels",
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="scale the replayed plan"
+    )
+    args, qt_args = parser.parse_known_args()
+
+    if args.profile:
+        import profiling
+
+        profiling.enable()
+
+    if args.replay:
+        sys.exit(replay(args))
+
+    app = QApplication(sys.argv[:1] + qt_args)
     win = DotDrawerApp()
     win.show()
+    if args.startup_report:
+        QTimer.singleShot(0, _print_startup_report)
     sys.exit(app.exec_())
 
 
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional
 
 
 @dataclass
@@ -13,3 +14,68 @@ class Region:
 class ColorLocation:
     x: int
     y: int
+
+
+@dataclass
+class BrushLocation:
+    x: int
+    y: int
+    size: int
+
+
+@dataclass
+class PaletteState:
+    active_color: Optional[ColorLocation] = None
+    active_brush: Optional[BrushLocation] = None
+
+
+@dataclass
+class CleanupSettings:
+    open_px: int = 0
+    min_component_px: int = 0
+    fill_holes_px: int = 0
+
+
+@dataclass
+class PlanSettings:
+    planner: str = "grid"
+    large_brush_px: int = 0
+    contour_tolerance: float = 1.5
+    dither: str = "none"
+    progressive: bool = False
+    dot_budget: int = 0
+    cleanup: CleanupSettings = field(default_factory=CleanupSettings)
+
+
+@dataclass
+class DrawStage:
+    color: str
+    brush_px: int
+    dots: object
+    strokes: list = field(default_factory=list)
+    pass_index: int = 0
+
+    @property
+    def event_count(self) -> int:
+        return len(self.dots) + len(self.strokes)
+
+
+@dataclass
+class DrawPlan:
+    width: int
+    height: int
+    stages: list
+    palette: dict
+    background: Optional[str] = None
+    stats: dict = field(default_factory=dict)
+
+    def drawn_stages(self) -> list:
+        return [
+            stage
+            for stage in self.stages
+            if stage.color != self.background and stage.event_count
+        ]
+
+    @property
+    def event_count(self) -> int:
+        return sum(stage.event_count for stage in self.drawn_stages())
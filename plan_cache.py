@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+from models import DrawPlan
+
+PLANNER_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+PLAN_SUFFIX = ".totsplan"
+PREVIEW_SUFFIX = ".png"
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "tots", "plans")
+
+
+def image_digest(img, path: Optional[str] = None) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    if path and os.path.isfile(path):
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(b"file")
+    else:
+        digest.update(f"{img.mode}:{img.size}".encode())
+        digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+class PlanCache:
+    def __init__(self, directory: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key_for(self, digest: str, **params) -> str:
+        payload = json.dumps(
+            {"image": digest, "params": params, "version": PLANNER_VERSION},
+            sort_keys=True,
+            default=list,
+        )
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    def _touch(self, path: str) -> bool:
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    def load(self, key: str) -> Optional[DrawPlan]:
+        from plan_file import load_plan
+
+        path = self._path(key, PLAN_SUFFIX)
+        if not self._touch(path):
+            return None
+        try:
+            return load_plan(path)[0]
+        except Exception as e:
+            print(f"Discarding unreadable cached plan {path}: {e}")
+            self._remove(path)
+            return None
+
+    def store(self, key: str, plan: DrawPlan, **header):
+        from plan_file import save_plan
+
+        path = self._path(key, PLAN_SUFFIX)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            save_plan(tmp_path, plan, **header)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write plan cache entry {path}: {e}")
+            self._remove(tmp_path)
+        self.evict()
+
+    def preview_path(self, key: str) -> Optional[str]:
+        path = self._path(key, PREVIEW_SUFFIX)
+        return path if self._touch(path) else None
+
+    def preview_target(self, key: str) -> str:
+        return self._path(key, PREVIEW_SUFFIX)
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        entries = []
+        try:
+            scan = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in scan:
+            if not entry.name.endswith((PLAN_SUFFIX, PREVIEW_SUFFIX)):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
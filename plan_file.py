@@ -0,0 +1,180 @@
+import json
+import struct
+from dataclasses import asdict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from models import (
+    BrushLocation,
+    ColorLocation,
+    DrawPlan,
+    DrawStage,
+    PlanSettings,
+    Region,
+)
+
+MAGIC = b"TOTSPLAN"
+VERSION = 1
+ALIGNMENT = 64
+PREAMBLE = struct.Struct("<8sHHI")
+
+
+class StrokeList:
+    def __init__(self, points: np.ndarray, offsets: np.ndarray):
+        self.points = points
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return max(len(self.offsets) - 1, 0)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.points[int(self.offsets[index]) : int(self.offsets[index + 1])]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def _align(value: int) -> int:
+    return -(-value // ALIGNMENT) * ALIGNMENT
+
+
+def _coordinate_dtype(arrays: list) -> str:
+    for arr in arrays:
+        if len(arr) and (arr.min() < -32768 or arr.max() > 32767):
+            return "<i4"
+    return "<i2"
+
+
+def save_plan(
+    path: str,
+    plan: DrawPlan,
+    region: Optional[Region] = None,
+    brush_px: int = 0,
+    settings: Optional[PlanSettings] = None,
+    color_locations: Optional[dict] = None,
+    brush_locations: Optional[list] = None,
+    **extra_settings,
+):
+    blobs = []
+    cursor = 0
+
+    def add(arr: np.ndarray) -> dict:
+        nonlocal cursor
+        arr = np.ascontiguousarray(arr)
+        entry = {"offset": cursor, "count": len(arr), "dtype": arr.dtype.str}
+        blobs.append((cursor, arr))
+        cursor = _align(cursor + arr.nbytes)
+        return entry
+
+    stages = []
+    for stage in plan.stages:
+        dots = np.asarray(stage.dots).reshape(-1, 2)
+        strokes = [np.asarray(s).reshape(-1, 2) for s in stage.strokes]
+        dtype = _coordinate_dtype([dots] + strokes)
+
+        lengths = np.array([len(s) for s in strokes], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype("<i8")
+        points = np.concatenate(strokes) if strokes else np.empty((0, 2), dtype=dtype)
+        stages.append(
+            {
+                "color": stage.color,
+                "brush_px": stage.brush_px,
+                "dots": add(dots.astype(dtype)),
+                "stroke_points": add(points.astype(dtype)),
+                "stroke_offsets": add(offsets),
+                "pass_index": stage.pass_index,
+            }
+        )
+
+    header = {
+        "width": plan.width,
+        "height": plan.height,
+        "region": asdict(region) if region is not None else None,
+        "brush_px": brush_px,
+        "color_locations": {
+            name: asdict(loc)
+            for name, loc in (color_locations or {}).items()
+            if loc is not None
+        },
+        "brush_locations": [asdict(loc) for loc in brush_locations or []],
+        "palette": plan.palette,
+        "background": plan.background,
+        "settings": dict(asdict(settings or PlanSettings()), **extra_settings),
+        "stats": plan.stats,
+        "stages": stages,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _align(PREAMBLE.size + len(header_bytes))
+
+    with open(path, "wb") as fh:
+        fh.write(PREAMBLE.pack(MAGIC, VERSION, 0, len(header_bytes)))
+        fh.write(header_bytes)
+        for offset, arr in blobs:
+            fh.seek(data_start + offset)
+            fh.write(arr.tobytes())
+        fh.truncate(data_start + cursor)
+
+
+def load_plan(path: str) -> Tuple[DrawPlan, dict]:
+    with open(path, "rb") as fh:
+        magic, version, _, header_len = PREAMBLE.unpack(fh.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a plan file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported plan file version {version}")
+        header = json.loads(fh.read(header_len).decode("utf-8"))
+
+    data_start = _align(PREAMBLE.size + header_len)
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+
+    def view(entry: dict, columns: int = 2) -> np.ndarray:
+        dtype = np.dtype(entry["dtype"])
+        start = data_start + entry["offset"]
+        end = start + entry["count"] * columns * dtype.itemsize
+        arr = data[start:end].view(dtype)
+        return arr.reshape(-1, columns) if columns > 1 else arr
+
+    stages = [
+        DrawStage(
+            stage["color"],
+            stage["brush_px"],
+            view(stage["dots"]),
+            StrokeList(view(stage["stroke_points"]), view(stage["stroke_offsets"], 1)),
+            stage.get("pass_index", 0),
+        )
+        for stage in header["stages"]
+    ]
+    plan = DrawPlan(
+        header["width"],
+        header["height"],
+        stages,
+        {
+            name: dict(color, rgb=tuple(color["rgb"]))
+            for name, color in header["palette"].items()
+        },
+        header["background"],
+        header["stats"],
+    )
+    return plan, header
+
+
+def saved_locations(header: dict) -> Tuple[dict, list]:
+    colors = {
+        name: ColorLocation(**loc)
+        for name, loc in header.get("color_locations", {}).items()
+    }
+    brushes = [BrushLocation(**loc) for loc in header.get("brush_locations", [])]
+    return colors, brushes
+
+
+def unplaced_colors(plan: DrawPlan, color_locations: dict) -> list:
+    colors = sorted({stage.color for stage in plan.drawn_stages()})
+    if len(colors) < 2:
+        return []
+    return [color for color in colors if color_locations.get(color) is None]
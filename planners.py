@@ -0,0 +1,392 @@
+import math
+from dataclasses import replace
+from functools import lru_cache
+
+import numpy as np
+from scipy.ndimage import maximum_filter, minimum_filter
+
+from models import DrawStage
+from utils import NO_COLOR, grid_positions, label_grid_positions, stamp_dots
+
+PROGRESSIVE_PASSES = 4
+
+
+def _points(coords) -> np.ndarray:
+    return np.asarray(coords, dtype=np.int32).reshape(-1, 2)
+
+
+def plan_grid(labels, names: list, brush_px: int) -> list:
+    color_dots = label_grid_positions(labels, names, max(brush_px // 2, 2))
+    return [DrawStage(name, brush_px, color_dots[name]) for name in names]
+
+
+def _lattice_covers(step: int, row: int, radius: int) -> bool:
+    rows = np.arange(2)
+    cols = np.arange(-1, 2)
+    xs = (cols[None, :] * step + (step // 2) * rows[:, None]).ravel()
+    ys = np.repeat(rows * row, len(cols))
+    px, py = np.meshgrid(np.arange(step), np.arange(row + 1))
+    near = (px.ravel()[:, None] - xs) ** 2 + (py.ravel()[:, None] - ys) ** 2
+    return bool((near.min(axis=1) <= radius * radius).all())
+
+
+@lru_cache(maxsize=None)
+def hex_spacing(radius: int) -> tuple:
+    best = (1, 1)
+    for step in range(2 * radius + 1, 0, -1):
+        if step * (2 * radius + 1) <= best[0] * best[1]:
+            break
+        low, high = best[0] * best[1] // step, 2 * radius + 1
+        while low < high:
+            row = (low + high + 1) // 2
+            if _lattice_covers(step, row, radius):
+                low = row
+            else:
+                high = row - 1
+        if step * low > best[0] * best[1]:
+            best = (step, low)
+    return best
+
+
+def hex_cells(dots: np.ndarray, radius: int, height: int, width: int) -> np.ndarray:
+    step, row = hex_spacing(radius)
+    dots = np.asarray(dots, dtype=np.int64).reshape(-1, 2)
+    rows = -(-dots[:, 1] // row)
+    shift = (step // 2) * (rows % 2)
+    cols = -(-(dots[:, 0] - shift) // step)
+    x = np.minimum(cols * step + shift, width - 1)
+    y = np.minimum(rows * row, height - 1)
+    on_lattice = (x == dots[:, 0]) & (y == dots[:, 1]) & (cols >= 0)
+    return np.where(on_lattice[:, None], np.stack([cols, rows], axis=1), -1)
+
+
+def hex_lattice(height: int, width: int, radius: int) -> np.ndarray:
+    step, row = hex_spacing(radius)
+    ys = np.arange(0, height - 1 + row, row)
+    points = []
+    for parity in (0, 1):
+        xs = np.arange((step // 2) * parity, width - 1 + step, step)
+        gx, gy = np.meshgrid(xs, ys[parity::2])
+        points.append(np.stack([gx.ravel(), gy.ravel()], axis=1))
+    points = np.concatenate(points)
+    order = np.lexsort((points[:, 0], points[:, 1]))
+    points = points[order]
+    np.minimum(points, [width - 1, height - 1], out=points)
+    return _points(points)
+
+
+def _edge_stamps(mask: np.ndarray, dots: np.ndarray, radius: int) -> np.ndarray:
+    covered = np.zeros(mask.shape, dtype=bool)
+    stamp_dots(covered, dots, radius, True)
+    missing = mask & ~covered
+    added = []
+    while missing.any():
+        ys, xs = np.nonzero(missing)
+        blocks = (ys // (2 * radius)) * mask.shape[1] + xs // (2 * radius)
+        _, first = np.unique(blocks, return_index=True)
+        picked = np.stack([xs[first], ys[first]], axis=1)
+        stamp_dots(covered, picked, radius, True)
+        missing &= ~covered
+        added.append(picked)
+    return _points(np.concatenate(added)) if added else _points([])
+
+
+def plan_hex(labels, names: list, brush_px: int) -> list:
+    radius = max(brush_px // 2, 1)
+    points = hex_lattice(*labels.shape, radius)
+    found = labels[points[:, 1], points[:, 0]]
+    order = np.argsort(found, kind="stable")
+    counts = np.bincount(found, minlength=256)
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    stages = []
+    for index, name in enumerate(names):
+        dots = points[order[bounds[index] : bounds[index + 1]]]
+        edges = _edge_stamps(labels == index, dots, radius)
+        stages.append(DrawStage(name, brush_px, np.concatenate([dots, edges])))
+    return stages
+
+
+def _pool(values: np.ndarray, reduce) -> np.ndarray:
+    h, w = values.shape
+    return reduce(values.reshape(h // 2, 2, w // 2, 2), axis=(1, 3))
+
+
+def _fill_stroke(x0: int, y0: int, size: int, cover: int) -> np.ndarray:
+    half = cover // 2
+    left = x0 + half
+    right = x0 + size - cover + half
+    points = []
+    for row, y in enumerate(range(y0 + half, y0 + size, cover)):
+        if row % 2 == 0:
+            points.extend([(left, y), (right, y)])
+        else:
+            points.extend([(right, y), (left, y)])
+    return _points(points)
+
+
+def plan_quadtree(labels, names: list, brush_px: int, large_brush_px: int):
+    spacing = max(brush_px // 2, 2)
+    cover = int(large_brush_px / math.sqrt(2))
+    if cover < 2 * spacing:
+        return None
+
+    margin = math.ceil((large_brush_px - cover) / 2)
+    if margin > 0:
+        size = 2 * margin + 1
+        low = minimum_filter(labels, size=size, mode="constant", cval=NO_COLOR)
+        high = maximum_filter(labels, size=size, mode="constant", cval=NO_COLOR)
+        safe = np.where(low == high, labels, NO_COLOR).astype(np.uint8)
+    else:
+        safe = labels
+
+    h, w = labels.shape
+    levels = 0
+    while cover * 2 ** (levels + 1) <= max(h, w):
+        levels += 1
+    top = 2**levels
+    cells_h = -(-math.ceil(h / cover) // top) * top
+    cells_w = -(-math.ceil(w / cover) // top) * top
+
+    padded = np.full((cells_h * cover, cells_w * cover), NO_COLOR, dtype=np.uint8)
+    padded[:h, :w] = safe
+    blocks = padded.reshape(cells_h, cover, cells_w, cover)
+    mins = [blocks.min(axis=(1, 3))]
+    maxs = [blocks.max(axis=(1, 3))]
+    for _ in range(levels):
+        mins.append(_pool(mins[-1], np.min))
+        maxs.append(_pool(maxs[-1], np.max))
+
+    claimed = np.zeros((cells_h, cells_w), dtype=bool)
+    stamps = {index: [] for index in range(len(names))}
+    strokes = {index: [] for index in range(len(names))}
+
+    for level in range(levels, -1, -1):
+        factor = 2**level
+        uniform = (mins[level] == maxs[level]) & (mins[level] != NO_COLOR)
+        taken = claimed.reshape(
+            cells_h // factor, factor, cells_w // factor, factor
+        ).any(axis=(1, 3))
+        fresh = uniform & ~taken
+        if not fresh.any():
+            continue
+
+        block = factor * cover
+        by, bx = np.nonzero(fresh)
+        found = mins[level][by, bx]
+        if level == 0:
+            centers = _points(np.stack([bx, by], axis=1) * cover + cover // 2)
+            for index in np.unique(found):
+                stamps[int(index)].append(centers[found == index])
+        else:
+            for y, x, index in zip(by, bx, found):
+                strokes[int(index)].append(
+                    _fill_stroke(int(x) * block, int(y) * block, block, cover)
+                )
+
+        claimed |= np.repeat(np.repeat(fresh, factor, axis=0), factor, axis=1)
+
+    grid = labels[::spacing, ::spacing].copy()
+    rows = np.arange(0, h, spacing) // cover
+    cols = np.arange(0, w, spacing) // cover
+    grid[claimed[rows][:, cols]] = NO_COLOR
+    fine_dots = grid_positions(grid, names, spacing)
+
+    stages = []
+    for index, name in enumerate(names):
+        stages.append(
+            DrawStage(
+                name,
+                large_brush_px,
+                _points(np.concatenate(stamps[index] or [_points([])])),
+                strokes[index],
+            )
+        )
+        stages.append(DrawStage(name, brush_px, fine_dots[name]))
+    return stages
+
+
+def _row_runs(grid_row, index: int):
+    inside = np.concatenate([[False], grid_row == index, [False]])
+    edges = np.flatnonzero(inside[1:] != inside[:-1])
+    return edges[0::2], edges[1::2] - 1
+
+
+def plan_contours(
+    labels, names: list, brush_px: int, tolerance: float, fill: bool = False
+) -> list:
+    import cv2
+
+    spacing = max(brush_px // 2, 2)
+    stages = []
+    for index, name in enumerate(names):
+        mask = (labels == index).astype(np.uint8)
+        dots = []
+        strokes = []
+
+        contours = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_NONE)[-2]
+        for contour in contours:
+            simplified = cv2.approxPolyDP(contour, tolerance, True).reshape(-1, 2)
+            if len(simplified) < 2:
+                dots.append(simplified[0])
+                continue
+            strokes.append(_points(np.vstack([simplified, simplified[:1]])))
+
+        if fill:
+            for y in range(0, labels.shape[0], spacing):
+                starts, ends = _row_runs(labels[y, ::spacing], index)
+                for x0, x1 in zip(starts * spacing, ends * spacing):
+                    if x0 == x1:
+                        dots.append((x0, y))
+                    else:
+                        strokes.append(_points([(x0, y), (x1, y)]))
+
+        stages.append(DrawStage(name, brush_px, _points(dots), strokes))
+    return stages
+
+
+def _lattice_levels(cells: np.ndarray, passes: int, staggered: bool) -> np.ndarray:
+    cols, rows = cells[:, 0], cells[:, 1]
+    levels = np.zeros(len(cells), dtype=np.int8)
+    for level in range(1, passes):
+        size = 2**level
+        shift = (rows // size) % 2 * (size // 2) if staggered else 0
+        keep = (cells >= 0).all(axis=1) & (rows % size == 0)
+        levels[keep & ((cols - shift) % size == 0)] = level
+    return levels
+
+
+def split_passes(
+    stages: list,
+    brush_px: int,
+    background=None,
+    passes: int = PROGRESSIVE_PASSES,
+    planner: str = "grid",
+    shape: tuple = (0, 0),
+) -> list:
+    spacing = max(brush_px // 2, 2)
+    result = []
+    for stage in stages:
+        if stage.color == background or stage.brush_px != brush_px:
+            result.append(replace(stage, pass_index=0))
+            continue
+        dots = np.asarray(stage.dots).reshape(-1, 2)
+        if planner == "hex":
+            cells = hex_cells(dots, max(brush_px // 2, 1), *shape)
+        else:
+            cells = dots // spacing
+        levels = _lattice_levels(cells, passes, planner == "hex")
+        for index in range(passes):
+            result.append(
+                DrawStage(
+                    stage.color,
+                    stage.brush_px,
+                    dots[levels == passes - 1 - index],
+                    list(stage.strokes) if index == 0 else [],
+                    index,
+                )
+            )
+    return result
+
+
+def _thin(items, keep: int):
+    if keep >= len(items):
+        return items
+    picks = np.linspace(0, len(items), keep, endpoint=False).astype(np.int64)
+    if isinstance(items, np.ndarray):
+        return items[picks]
+    return [items[i] for i in picks]
+
+
+def apply_dot_budget(stages: list, budget: int, background=None) -> list:
+    drawn = [s for s in stages if s.color != background]
+    remaining = budget
+    result = [s for s in stages if s.color == background]
+    for index in sorted({s.pass_index for s in drawn}):
+        group = [s for s in drawn if s.pass_index == index]
+        total = sum(s.event_count for s in group)
+        if total <= remaining:
+            result.extend(group)
+            remaining -= total
+            continue
+        fraction = remaining / total
+        for stage in group:
+            strokes = _thin(list(stage.strokes), int(len(stage.strokes) * fraction))
+            dots = _thin(stage.dots, int(len(stage.dots) * fraction))
+            result.append(replace(stage, dots=dots, strokes=strokes))
+        break
+    return result
+
+
+def plan_accuracy(plan, labels, names: list) -> float:
+    fill = NO_COLOR
+    if plan.background in names:
+        fill = names.index(plan.background)
+    canvas = np.full(labels.shape, fill, dtype=np.uint8)
+    for stage in plan.drawn_stages():
+        index = names.index(stage.color)
+        radius = max(1, stage.brush_px // 2)
+        stamp_dots(canvas, stage_centers(stage, radius), radius, index)
+    return float(np.mean(canvas == labels))
+
+
+def stage_centers(stage, step: int) -> np.ndarray:
+    dots = np.asarray(stage.dots, dtype=np.float64).reshape(-1, 2)
+    strokes = [np.asarray(s, dtype=np.float64).reshape(-1, 2) for s in stage.strokes]
+    strokes = [stroke for stroke in strokes if len(stroke)]
+    if not strokes:
+        return dots.astype(np.int64)
+
+    points = np.concatenate(strokes)
+    last = np.zeros(len(points), dtype=bool)
+    last[np.cumsum([len(stroke) for stroke in strokes]) - 1] = True
+    first = np.flatnonzero(~last)
+    start = points[first]
+    delta = points[first + 1] - start
+    count = np.maximum(1, np.hypot(delta[:, 0], delta[:, 1]) // max(step, 1))
+    count = count.astype(np.int64)
+    segment = np.repeat(np.arange(len(count)), count)
+    offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    t = offset * (1.0 / count[segment])
+    sampled = start[segment] + delta[segment] * t[:, None]
+    return np.rint(np.concatenate([dots, sampled, points[last]])).astype(np.int64)
+
+
+def coverage_counts(plan, radius_scale: float = 0.5) -> np.ndarray:
+    from scipy.signal import fftconvolve
+
+    counts = np.zeros((plan.height, plan.width), dtype=np.float64)
+    for stage in plan.drawn_stages():
+        radius = max(1, int(stage.brush_px * radius_scale))
+        centers = stage_centers(stage, radius)
+        inside = (
+            (centers[:, 0] >= 0)
+            & (centers[:, 0] < plan.width)
+            & (centers[:, 1] >= 0)
+            & (centers[:, 1] < plan.height)
+        )
+        hits = np.bincount(
+            centers[inside, 1] * plan.width + centers[inside, 0],
+            minlength=counts.size,
+        ).reshape(counts.shape)
+        offsets = np.arange(-radius, radius + 1)
+        disc = (offsets[:, None] ** 2 + offsets[None, :] ** 2 <= radius**2).astype(
+            np.float64
+        )
+        counts += fftconvolve(hits, disc, mode="same")
+    return np.rint(counts).astype(np.int32)
+
+
+def rasterize_plan(plan, radius_scale: float = 1 / 3) -> np.ndarray:
+    canvas = np.full((plan.height, plan.width, 3), 255, dtype=np.uint8)
+    for stage in plan.drawn_stages():
+        color = plan.palette.get(stage.color, {}).get("rgb", (0, 0, 0))
+        radius = max(1, int(stage.brush_px * radius_scale))
+        stamp_dots(canvas, stage_centers(stage, radius), radius, color)
+    return canvas
+
+
+def coverage_overlay(plan) -> np.ndarray:
+    canvas = rasterize_plan(plan, radius_scale=0.5).astype(np.float32)
+    overlap = np.clip(coverage_counts(plan) - 1, 0, 3)[..., None] * 0.2
+    canvas = canvas * (1 - overlap) + np.array([255, 0, 0], np.float32) * overlap
+    return np.rint(canvas).astype(np.uint8)
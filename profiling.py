@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("TOTS_PROFILE", "") not in ("", "0")
+
+_local = threading.local()
+
+
+def profile_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.environ.get("TOTS_PROFILE_DIR") or os.path.join(base, "tots", "profiles")
+
+
+def enable():
+    global ENABLED
+    import tracemalloc
+
+    ENABLED = True
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def _traced_memory() -> int:
+    import tracemalloc
+
+    if not tracemalloc.is_tracing():
+        return 0
+    return tracemalloc.get_traced_memory()[0]
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullTimer()
+
+
+class _StageTimer:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.depth = getattr(_local, "depth", 0)
+        _local.depth = self.depth + 1
+        self.memory = _traced_memory()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        _local.depth = self.depth
+        records = getattr(_local, "records", None)
+        if records is not None:
+            records.append(
+                (
+                    self.started,
+                    self.depth,
+                    self.name,
+                    elapsed,
+                    _traced_memory() - self.memory,
+                )
+            )
+        return False
+
+
+class _Interaction(_StageTimer):
+    def __enter__(self):
+        import cProfile
+        import tracemalloc
+
+        _local.records = []
+        tracemalloc.reset_peak()
+        self.profiler = cProfile.Profile()
+        try:
+            self.profiler.enable()
+        except ValueError:
+            self.profiler = None
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        import tracemalloc
+
+        super().__exit__(*exc)
+        if self.profiler is not None:
+            self.profiler.disable()
+        peak = tracemalloc.get_traced_memory()[1]
+        records = _local.records
+        _local.records = None
+        self._report(records, peak)
+        return False
+
+    def _report(self, records: list, peak: int):
+        records.sort()
+        _, _, name, elapsed, _ = records[0]
+        print(f"[profile] {name}: {elapsed * 1000:.1f} ms, peak {peak / 2**20:.1f} MB")
+        for _, depth, name, elapsed, allocated in records[1:]:
+            print(
+                f"[profile] {'  ' * depth}{name:<{24 - 2 * depth}} "
+                f"{elapsed * 1000:8.1f} ms {allocated / 2**20:+8.1f} MB"
+            )
+
+        if self.profiler is None:
+            return
+        directory = profile_dir()
+        stamp = (
+            time.strftime("%Y%m%d-%H%M%S") + f"-{time.time_ns() // 10**6 % 1000:03d}"
+        )
+        path = os.path.join(directory, f"{stamp}-{self.name}.pstats")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self.profiler.dump_stats(path)
+            print(f"[profile] cProfile stats written to {path}")
+        except OSError as e:
+            print(f"[profile] Could not write profile stats: {e}")
+
+
+def record(name: str, started: float, elapsed: float):
+    records = getattr(_local, "records", None)
+    if ENABLED and records is not None:
+        depth = getattr(_local, "depth", 0)
+        records.append((started, depth, name, elapsed, 0))
+
+
+def stage(name: str):
+    if not ENABLED:
+        return _NULL
+    return _StageTimer(name)
+
+
+def interaction(name: str):
+    if not ENABLED:
+        return _NULL
+    if getattr(_local, "records", None) is not None:
+        return _StageTimer(name)
+    return _Interaction(name)
+
+
+if ENABLED:
+    enable()
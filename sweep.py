@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+from utils import (
+    BLUR_SIGMA,
+    NO_COLOR,
+    build_palette_lut,
+    palette_names,
+    palette_source,
+    resized_gray,
+)
+
+
+@dataclass
+class SweepResult:
+    thresholds: list
+    brightnesses: list
+    grids: np.ndarray
+    names: list
+    palette: dict
+    backgrounds: list
+    events: np.ndarray
+
+
+def sweep_grid(
+    img,
+    region_w: int,
+    region_h: int,
+    brush_px: int,
+    thresholds: list,
+    brightnesses: list,
+    color_locations: dict = None,
+    sampled_colors: dict = None,
+):
+    gray = resized_gray(img, region_w, region_h)
+    if gray is None:
+        return None
+
+    source = palette_source(color_locations, sampled_colors)
+    names, palette = palette_names(source)
+    luminances = [palette[name]["luminance"] for name in names]
+    luts = np.stack([build_palette_lut(luminances, t) for t in thresholds])
+
+    spacing = max(brush_px // 2, 2)
+    levels = np.empty(
+        (len(brightnesses),) + gray[::spacing, ::spacing].shape, dtype=np.uint8
+    )
+    for index, brightness in enumerate(brightnesses):
+        shifted = np.clip(gray + brightness, 0, 255)
+        if not source:
+            levels[index] = shifted[::spacing, ::spacing]
+            continue
+        smoothed = gaussian_filter(shifted.astype(np.float32), BLUR_SIGMA)
+        levels[index] = np.clip(np.rint(smoothed[::spacing, ::spacing]), 0, 255)
+    grids = luts[:, levels]
+
+    histograms = np.stack(
+        [np.bincount(level.ravel(), minlength=256) for level in levels]
+    )
+    classes = (luts[:, :, None] == np.arange(256)).astype(np.int64)
+    totals = np.einsum("bl,tlc->tbc", histograms, classes)
+    counts = totals[..., : len(names)]
+    uncoloured = totals[..., NO_COLOR]
+    has_background = (uncoloured == 0) & (len(names) > 1)
+    background_index = counts.argmax(axis=-1)
+    skipped = np.where(
+        has_background,
+        np.take_along_axis(counts, background_index[..., None], -1)[..., 0],
+        0,
+    )
+    events = levels[0].size - uncoloured - skipped
+    backgrounds = [
+        [
+            names[background_index[t, b]] if has_background[t, b] else None
+            for b in range(len(brightnesses))
+        ]
+        for t in range(len(thresholds))
+    ]
+    return SweepResult(
+        list(thresholds), list(brightnesses), grids, names, palette, backgrounds, events
+    )
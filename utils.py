@@ -1,24 +1,96 @@
-from PyQt5.QtGui import QPixmap, QImage
+from PyQt5.QtGui import QImage
 from PIL import Image
-import numpy as np
-from scipy.ndimage import gaussian_filter
-import pyautogui
+import os
+import sys
+import threading
 import time
 
+from models import DrawPlan, PlanSettings
+from profiling import interaction, record, stage
 
-def pil_to_qpixmap(pil_img):
-    if pil_img.mode == "RGBA":
-        data = pil_img.tobytes("raw", "RGBA")
-        qimg = QImage(data, pil_img.width, pil_img.height, QImage.Format_RGBA8888)
+HEAVY_MODULES = ("numpy", "scipy.ndimage", "pyautogui")
+MAX_PALETTE_COLORS = 16
+DITHER_PLANNERS = ("grid", "hex")
+NO_COLOR = 255
+BLUR_SIGMA = 0.5
+BLUR_HALO = int(4.0 * BLUR_SIGMA + 0.5)
+LABEL_BAND_PIXELS = 1 << 20
+
+_label_pool = None
+_label_pool_lock = threading.Lock()
+
+
+def array_to_qimage(arr):
+    import numpy as np
+
+    if arr.ndim == 2:
+        fmt = QImage.Format_Grayscale8
+    elif arr.shape[2] == 3:
+        fmt = QImage.Format_RGB888
+    elif arr.shape[2] == 4:
+        fmt = QImage.Format_RGBA8888
     else:
-        if pil_img.mode != "RGB":
-            pil_img = pil_img.convert("RGB")
-        data = pil_img.tobytes("raw", "RGB")
-        qimg = QImage(data, pil_img.width, pil_img.height, QImage.Format_RGB888)
-    return QPixmap.fromImage(qimg)
+        raise ValueError(f"Unsupported array shape {arr.shape}")
+
+    if arr.dtype != np.uint8:
+        arr = arr.astype(np.uint8)
+    pixel = 1 if arr.ndim == 2 else arr.shape[2]
+    rows_packed = arr.strides[-1] == 1 and (arr.ndim == 2 or arr.strides[1] == pixel)
+    if not rows_packed or arr.strides[0] < arr.shape[1] * pixel:
+        arr = np.ascontiguousarray(arr)
+
+    height, width = arr.shape[:2]
+    qimg = QImage(arr.ctypes.data, width, height, arr.strides[0], fmt)
+    qimg._buffer = arr
+    return qimg
+
+
+def qimage_to_pil(qimg):
+    if qimg.format() != QImage.Format_ARGB32:
+        qimg = qimg.convertToFormat(QImage.Format_ARGB32)
+
+    ptr = qimg.constBits()
+    ptr.setsize(qimg.sizeInBytes())
+    rawmode = "BGRA" if sys.byteorder == "little" else "ARGB"
+    return Image.frombuffer(
+        "RGBA",
+        (qimg.width(), qimg.height()),
+        ptr,
+        "raw",
+        rawmode,
+        qimg.bytesPerLine(),
+        1,
+    )
+
+
+def stamp_dots(canvas, dots, radius, color):
+    import numpy as np
+
+    if len(dots) == 0:
+        return
+    dots = np.asarray(dots, dtype=np.int64).reshape(-1, 2)
+    height, width = canvas.shape[:2]
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            if dx * dx + dy * dy > radius * radius:
+                continue
+            xs = dots[:, 0] + dx
+            ys = dots[:, 1] + dy
+            inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+            canvas[ys[inside], xs[inside]] = color
+
+
+def warm_up_imports():
+    for name in HEAVY_MODULES:
+        try:
+            __import__(name)
+        except Exception as e:
+            print(f"Warm-up import of {name} failed: {e}")
 
 
 def sample_color_at_location(location):
+    import pyautogui
+
     try:
         screenshot = pyautogui.screenshot()
         color = screenshot.getpixel((location.x, location.y))
@@ -33,14 +105,35 @@ def rgb_to_luminance(rgb):
     return 0.299 * r + 0.587 * g + 0.114 * b
 
 
-def create_luminance_based_masks(img_array, color_sources, brush_px, threshold):
-    smoothed = gaussian_filter(img_array.astype(float), sigma=0.5)
+def sample_colors_at_locations(locations: dict) -> dict:
+    import pyautogui
 
-    active_colors = {}
+    try:
+        screenshot = pyautogui.screenshot()
+    except Exception as e:
+        print(f"Error taking screenshot for color sampling: {e}")
+        return {}
+
+    colors = {}
+    for name, location in locations.items():
+        try:
+            colors[name] = screenshot.getpixel((location.x, location.y))[:3]
+        except Exception as e:
+            print(f"Error sampling color at {location.x}, {location.y}: {e}")
+    return colors
 
+
+def resolve_palette(color_sources: dict) -> dict:
+    active_colors = {}
     if not color_sources:
-        black_mask = smoothed < threshold
-        return {"black": black_mask}, {"black": {"rgb": (0, 0, 0), "luminance": 0}}
+        return active_colors
+
+    locations = {
+        name: src
+        for name, src in color_sources.items()
+        if src is not None and hasattr(src, "x") and hasattr(src, "y")
+    }
+    sampled = sample_colors_at_locations(locations) if locations else {}
 
     for color_type, src in color_sources.items():
         if src is None:
@@ -48,13 +141,8 @@ def create_luminance_based_masks(img_array, color_sources, brush_px, threshold):
 
         sampled_color = None
 
-        if hasattr(src, "x") and hasattr(src, "y"):
-            sampled_color = sample_color_at_location(src)
-        elif isinstance(src, (tuple, list)) and len(src) == 3:
-            try:
-                sampled_color = tuple(int(c) for c in src)
-            except Exception:
-                sampled_color = None
+        if color_type in locations:
+            sampled_color = sampled.get(color_type)
         else:
             try:
                 vals = tuple(int(c) for c in src)
@@ -67,61 +155,186 @@ def create_luminance_based_masks(img_array, color_sources, brush_px, threshold):
             luminance = rgb_to_luminance(sampled_color)
             active_colors[color_type] = {"rgb": sampled_color, "luminance": luminance}
 
-    if not active_colors:
-        black_mask = smoothed < threshold
-        return {"black": black_mask}, {"black": {"rgb": (0, 0, 0), "luminance": 0}}
-
-    sorted_colors = sorted(active_colors.items(), key=lambda x: x[1]["luminance"])
-    masks = {}
-
-    if len(sorted_colors) == 1:
-        color_name, color_data = sorted_colors[0]
-        masks[color_name] = smoothed < threshold
-    elif len(sorted_colors) == 2:
-        dark_name, dark_data = sorted_colors[0]
-        light_name, light_data = sorted_colors[1]
-
-        luminance_range = light_data["luminance"] - dark_data["luminance"]
-        if luminance_range < 20:
-            base_threshold = threshold
-        else:
-            luminance_center = (dark_data["luminance"] + light_data["luminance"]) / 2
-            threshold_offset = (threshold - 128) * 0.5
-            base_threshold = luminance_center + threshold_offset
+    return active_colors
 
-        masks[dark_name] = smoothed < base_threshold
-        masks[light_name] = smoothed >= base_threshold
-    else:
-        dark_name, dark_data = sorted_colors[0]
-        medium_name, medium_data = sorted_colors[1]
-        light_name, light_data = sorted_colors[2]
 
-        total_range = light_data["luminance"] - dark_data["luminance"]
-        threshold_offset = (threshold - 128) * 0.3
+def palette_split_points(luminances: list, threshold: int) -> list:
+    count = len(luminances)
+    if count <= 1:
+        return [float(threshold)]
 
-        if total_range < 30:
-            dark_threshold = threshold - 20
-            light_threshold = threshold + 20
-        else:
-            dark_threshold = (
-                dark_data["luminance"]
-                + (medium_data["luminance"] - dark_data["luminance"]) * 0.7
-                + threshold_offset
+    if luminances[-1] - luminances[0] < 10 * count:
+        return [threshold + 20 * (2 * i - (count - 2)) for i in range(count - 1)]
+
+    threshold_offset = (threshold - 128) * (0.5 if count == 2 else 0.3)
+    splits = []
+    for i in range(count - 1):
+        weight = 0.5 if count == 2 else 0.7 - 0.4 * i / (count - 2)
+        gap = luminances[i + 1] - luminances[i]
+        splits.append(luminances[i] + gap * weight + threshold_offset)
+    return splits
+
+
+def build_palette_lut(luminances: list, threshold: int):
+    import numpy as np
+
+    splits = np.sort(np.asarray(palette_split_points(luminances, threshold)))
+    lut = np.searchsorted(splits, np.arange(256), side="right").astype(np.uint8)
+    if len(luminances) <= 1:
+        lut[lut > 0] = NO_COLOR
+    return lut
+
+
+def _label_band(img_array, lut, out, start: int, end: int):
+    import numpy as np
+    from scipy.ndimage import gaussian_filter
+
+    began = time.perf_counter()
+    top = max(0, start - BLUR_HALO)
+    bottom = min(img_array.shape[0], end + BLUR_HALO)
+    smoothed = gaussian_filter(img_array[top:bottom].astype(np.float32), BLUR_SIGMA)
+    smoothed = smoothed[start - top : end - top]
+    blurred = time.perf_counter()
+    levels = np.clip(np.rint(smoothed), 0, 255).astype(np.uint8)
+    np.take(lut, levels, out=out[start:end])
+    return blurred - began, time.perf_counter() - blurred
+
+
+def _label_executor():
+    global _label_pool
+    from concurrent.futures import ThreadPoolExecutor
+
+    with _label_pool_lock:
+        if _label_pool is None:
+            _label_pool = ThreadPoolExecutor(
+                os.cpu_count() or 1, thread_name_prefix="label-band"
             )
-            light_threshold = (
-                medium_data["luminance"]
-                + (light_data["luminance"] - medium_data["luminance"]) * 0.3
-                + threshold_offset
+        return _label_pool
+
+
+def blur_and_label(img_array, lut):
+    import numpy as np
+
+    height, width = img_array.shape
+    out = np.empty((height, width), dtype=np.uint8)
+    rows = max(LABEL_BAND_PIXELS // max(width, 1), 4 * BLUR_HALO)
+    bands = [(start, min(start + rows, height)) for start in range(0, height, rows)]
+    started = time.perf_counter()
+    if len(bands) == 1 or (os.cpu_count() or 1) == 1:
+        timings = [_label_band(img_array, lut, out, start, end) for start, end in bands]
+    else:
+        futures = [
+            _label_executor().submit(_label_band, img_array, lut, out, start, end)
+            for start, end in bands
+        ]
+        timings = [future.result() for future in futures]
+
+    record("blur", started, sum(blur for blur, _ in timings))
+    record("lut", started, sum(lut for _, lut in timings))
+    return out
+
+
+def palette_names(color_sources) -> tuple:
+    with stage("palette"):
+        active_colors = resolve_palette(color_sources)
+    if not active_colors:
+        active_colors = {"black": {"rgb": (0, 0, 0), "luminance": 0}}
+
+    names = sorted(active_colors, key=lambda name: active_colors[name]["luminance"])
+    return names, active_colors
+
+
+def create_palette_labels(img_array, color_sources, threshold):
+    names, active_colors = palette_names(color_sources)
+    lut = build_palette_lut(
+        [active_colors[name]["luminance"] for name in names], threshold
+    )
+    if not color_sources:
+        with stage("lut"):
+            return lut[img_array], names, active_colors
+    with stage("blur and label"):
+        labels = blur_and_label(img_array, lut)
+    return labels, names, active_colors
+
+
+def grid_positions(grid, names: list, spacing: int) -> dict:
+    import numpy as np
+
+    flat = grid.ravel()
+    order = np.argsort(flat, kind="stable")
+    counts = np.bincount(flat, minlength=256)
+
+    grid_w = grid.shape[1]
+    ys = (order // grid_w) * spacing
+    xs = (order % grid_w) * spacing
+    positions = np.stack([xs, ys], axis=1).astype(np.int32)
+
+    color_dots = {}
+    start = 0
+    for index in range(len(names)):
+        end = start + counts[index]
+        color_dots[names[index]] = positions[start:end]
+        start = end
+    return color_dots
+
+
+def label_grid_positions(labels, names: list, spacing: int) -> dict:
+    return grid_positions(labels[::spacing, ::spacing], names, spacing)
+
+
+def choose_background(labels, names: list):
+    import numpy as np
+
+    counts = np.bincount(labels.ravel(), minlength=256)
+    if counts[NO_COLOR] or len(names) < 2:
+        return None
+    return names[int(np.argmax(counts[: len(names)]))]
+
+
+def _count_drawn(grid, names: list, background) -> int:
+    import numpy as np
+
+    skipped = [NO_COLOR]
+    if background is not None:
+        skipped.append(names.index(background))
+    return int(np.count_nonzero(~np.isin(grid, skipped)))
+
+
+def resized_gray(img: Image.Image, region_w: int, region_h: int):
+    import numpy as np
+
+    with stage("grayscale"):
+        if img.mode == "RGBA":
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(
+                img, mask=img.split()[3] if len(img.split()) == 4 else None
             )
+            img_gray = background.convert("L")
+        else:
+            img_gray = img.convert("L")
 
-        masks[dark_name] = smoothed < dark_threshold
-        masks[medium_name] = (smoothed >= dark_threshold) & (smoothed < light_threshold)
-        masks[light_name] = smoothed >= light_threshold
+    img_w, img_h = img_gray.size
+    if img_w == 0 or img_h == 0:
+        return None
 
-    return masks, active_colors
+    scale = min(region_w / img_w, region_h / img_h)
+    target_w = max(1, int(img_w * scale))
+    target_h = max(1, int(img_h * scale))
 
+    with stage("resize"):
+        img_resized_gray = img_gray.resize((target_w, target_h), resample=Image.LANCZOS)
+        return np.array(img_resized_gray, dtype=np.int16)
 
-def process_image_for_multicolor_drawing(
+
+def palette_source(color_locations: dict, sampled_colors: dict):
+    if sampled_colors and any(v is not None for v in sampled_colors.values()):
+        return sampled_colors
+    if color_locations and any(v is not None for v in color_locations.values()):
+        return color_locations
+    return None
+
+
+def plan_labels(
     img: Image.Image,
     region_w: int,
     region_h: int,
@@ -130,71 +343,185 @@ def process_image_for_multicolor_drawing(
     color_locations: dict = None,
     sampled_colors: dict = None,
     brightness_offset: int = 0,
+    settings: PlanSettings = None,
 ):
-    try:
-        original_img = img.copy()
+    import numpy as np
 
-        if img.mode == "RGBA":
-            background = Image.new("RGB", img.size, (255, 255, 255))
-            background.paste(
-                img, mask=img.split()[3] if len(img.split()) == 4 else None
-            )
-            img_gray = background.convert("L")
-            color_img = background
-        else:
-            if img.mode != "RGB":
-                color_img = img.convert("RGB")
-            else:
-                color_img = img
-            img_gray = img.convert("L")
+    settings = settings or PlanSettings()
+    gray = resized_gray(img, region_w, region_h)
+    if gray is None:
+        return None
+    arr = np.clip(gray + brightness_offset, 0, 255).astype(np.uint8)
 
-        img_w, img_h = img_gray.size
-        if img_w == 0 or img_h == 0:
-            return None
+    source_for_masking = palette_source(color_locations, sampled_colors)
 
-        scale = min(region_w / img_w, region_h / img_h)
-        target_w = max(1, int(img_w * scale))
-        target_h = max(1, int(img_h * scale))
+    spacing = max(brush_px // 2, 2)
+    dither = settings.dither
+    if settings.planner not in DITHER_PLANNERS:
+        dither = "none"
+    if dither in ("ordered", "diffusion"):
+        from dithering import dither_palette_labels
 
-        img_resized_gray = img_gray.resize((target_w, target_h), resample=Image.LANCZOS)
-        img_resized_color = color_img.resize(
-            (target_w, target_h), resample=Image.LANCZOS
+        with stage(f"dither {dither}"):
+            labels, names, active_colors = dither_palette_labels(
+                arr, source_for_masking, threshold, spacing, dither
+            )
+    else:
+        labels, names, active_colors = create_palette_labels(
+            arr, source_for_masking, threshold
         )
+    background = choose_background(labels, names)
+
+    cleanup = settings.cleanup
+    removed = 0
+    if cleanup.open_px or cleanup.min_component_px > 1 or cleanup.fill_holes_px:
+        with stage("cleanup"):
+            from cleanup import clean_labels
+
+            drawn_before = _count_drawn(labels[::spacing, ::spacing], names, background)
+            labels = clean_labels(labels, names, background, cleanup)
+            removed = drawn_before - _count_drawn(
+                labels[::spacing, ::spacing], names, background
+            )
+    return labels, names, active_colors, background, removed, dither
 
-        arr = np.array(img_resized_gray, dtype=np.int16)
-        arr = np.clip(arr + brightness_offset, 0, 255).astype(np.uint8)
 
-        if arr.size == 0:
+def measure_plan_accuracy(
+    plan: DrawPlan,
+    img: Image.Image,
+    region_w: int,
+    region_h: int,
+    threshold: int,
+    brush_px: int,
+    color_locations: dict = None,
+    sampled_colors: dict = None,
+    brightness_offset: int = 0,
+    settings: PlanSettings = None,
+):
+    from planners import plan_accuracy
+
+    with interaction("accuracy"):
+        try:
+            result = plan_labels(
+                img,
+                region_w,
+                region_h,
+                threshold,
+                brush_px,
+                color_locations,
+                sampled_colors,
+                brightness_offset,
+                settings,
+            )
+            if result is None:
+                return None
+            labels, names = result[:2]
+            return plan_accuracy(plan, labels, names)
+        except Exception as e:
+            print(f"Error measuring plan accuracy: {e}")
             return None
 
-        np.random.seed(42)
 
-        source_for_masking = None
-        if sampled_colors and any(v is not None for v in sampled_colors.values()):
-            source_for_masking = sampled_colors
-        elif color_locations and any(v is not None for v in color_locations.values()):
-            source_for_masking = color_locations
-
-        if source_for_masking:
-            masks, active_colors = create_luminance_based_masks(
-                arr, source_for_masking, brush_px, threshold
+def process_image_for_multicolor_drawing(
+    img: Image.Image,
+    region_w: int,
+    region_h: int,
+    threshold: int,
+    brush_px: int,
+    color_locations: dict = None,
+    sampled_colors: dict = None,
+    brightness_offset: int = 0,
+    settings: PlanSettings = None,
+):
+    from planners import (
+        apply_dot_budget,
+        plan_contours,
+        plan_grid,
+        plan_hex,
+        plan_quadtree,
+        split_passes,
+    )
+
+    settings = settings or PlanSettings()
+
+    with interaction("plan"):
+        try:
+            result = plan_labels(
+                img,
+                region_w,
+                region_h,
+                threshold,
+                brush_px,
+                color_locations,
+                sampled_colors,
+                brightness_offset,
+                settings,
             )
-        else:
-            masks = {"black": arr < threshold}
-            active_colors = {"black": {"rgb": (0, 0, 0), "luminance": 0}}
-
-        color_dots = {}
-        for color_name, mask in masks.items():
-            positions = []
+            if result is None:
+                return None
+            labels, names, active_colors, background, removed, dither = result
+            target_h, target_w = labels.shape
             spacing = max(brush_px // 2, 2)
-            for y in range(0, target_h, spacing):
-                for x in range(0, target_w, spacing):
-                    if mask[y, x]:
-                        positions.append((x, y))
-            color_dots[color_name] = positions
 
-        return img_resized_color, color_dots, active_colors
+            planner = settings.planner
+            stages = None
+            with stage(f"planner {planner}"):
+                if planner == "quadtree" and settings.large_brush_px > brush_px:
+                    stages = plan_quadtree(
+                        labels, names, brush_px, settings.large_brush_px
+                    )
+                elif planner == "hex":
+                    stages = plan_hex(labels, names, brush_px)
+                elif planner in ("contour", "contour_fill"):
+                    stages = plan_contours(
+                        labels,
+                        names,
+                        brush_px,
+                        settings.contour_tolerance,
+                        fill=planner == "contour_fill",
+                    )
+                if stages is None:
+                    planner = "grid"
+                    stages = plan_grid(labels, names, brush_px)
+
+            plan = DrawPlan(
+                target_w,
+                target_h,
+                stages,
+                active_colors,
+                background,
+            )
 
-    except Exception as e:
-        print(f"Error in process_image_for_multicolor_drawing: {e}")
-        return None
+            with stage("ordering"):
+                if settings.progressive:
+                    plan.stages = split_passes(
+                        plan.stages,
+                        brush_px,
+                        plan.background,
+                        planner=planner,
+                        shape=labels.shape,
+                    )
+                planned_events = plan.event_count
+                if settings.dot_budget > 0 and plan.event_count > settings.dot_budget:
+                    plan.stages = apply_dot_budget(
+                        plan.stages, settings.dot_budget, plan.background
+                    )
+
+            plan.stats = {
+                "planner": planner,
+                "events": plan.event_count,
+                "grid_events": _count_drawn(
+                    labels[::spacing, ::spacing], names, background
+                ),
+            }
+            if removed:
+                plan.stats["cleanup_removed"] = removed
+            if dither != settings.dither:
+                plan.stats["dither_ignored"] = settings.dither
+            if planned_events > plan.event_count:
+                plan.stats["budget_dropped"] = planned_events - plan.event_count
+            return plan
+
+        except Exception as e:
+            print(f"Error in process_image_for_multicolor_drawing: {e}")
+            return None